@@ -1,24 +1,31 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
-from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-import os
-from datetime import datetime, timedelta
-import cv2
-import numpy as np
-import base64
-from werkzeug.utils import secure_filename
+import startup_profile
 
-from improved_face_recognition import ImprovedFaceRecognitionSystem
-face_system = ImprovedFaceRecognitionSystem()
+with startup_profile.phase('import flask and database modules'):
+    from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, Response, stream_with_context, abort
+    from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+    import os
+    import threading
+    import click
+    from datetime import datetime, timedelta
+    import base64
+    from werkzeug.utils import secure_filename
+    from sqlalchemy.exc import IntegrityError
 
-from database import db, College, Admin, Student, Attendance
-from face_recognition_system import FaceRecognitionSystem
+    from database import db, College, Admin, Student, Attendance, GalleryCalibration, GalleryRevision
+
+# OpenCV, NumPy and the recognition system are imported lazily by
+# get_face_system() so that web-only workers never pay for them.
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'cogniface-secret-key-2024'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///cogniface.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///cogniface.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads/student_photos'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Comma-separated recognition node URLs; recognition runs in-process when empty
+app.config['RECOGNITION_NODES'] = [url for url in os.environ.get('RECOGNITION_NODES', '').split(',') if url]
+# 'haar' (default) or the faster 'lbp' cascade for in-process recognition
+app.config['FACE_DETECTOR'] = os.environ.get('FACE_DETECTOR', 'haar')
 
 # Initialize extensions
 db.init_app(app)
@@ -30,8 +37,276 @@ login_manager.login_message = 'Please log in to access this page.'
 # Create upload directory
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Initialize face recognition system
-face_system = FaceRecognitionSystem()
+# Face recognition system, created on first use by get_face_system()
+_face_system = None
+_face_system_lock = threading.Lock()
+# One lock per college so a gallery is loaded once even when its first requests race
+_gallery_locks = {}
+_gallery_locks_lock = threading.Lock()
+# GalleryRevision each in-process college gallery was loaded or last patched at
+_gallery_revisions = {}
+
+def get_face_system():
+    """Return the shared face recognition system, initializing it on first use"""
+    global _face_system
+    if _face_system is None:
+        with _face_system_lock:
+            if _face_system is None:
+                with startup_profile.phase('initialize face recognition system'):
+                    if app.config['RECOGNITION_NODES']:
+                        from recognition_client import RemoteFaceSystem
+                        _face_system = RemoteFaceSystem(app.config['RECOGNITION_NODES'])
+                    else:
+                        from face_recognition_system import FaceRecognitionSystem
+                        _face_system = FaceRecognitionSystem(app.config['FACE_DETECTOR'])
+    return _face_system
+
+def gallery_lock(college_id):
+    with _gallery_locks_lock:
+        return _gallery_locks.setdefault(college_id, threading.Lock())
+
+def gallery_revision(college_id):
+    """Current revision of a college's students and calibration (0 before any change)"""
+    return db.session.scalar(db.select(GalleryRevision.revision).filter_by(college_id=college_id)) or 0
+
+def bump_gallery_revision(college_id):
+    """Bump a college's revision in the current transaction and return the new value"""
+    if db.session.scalar(db.select(GalleryRevision.id).filter_by(college_id=college_id)) is None:
+        # Two workers can make a college's first change at once; whichever inserts
+        # second only loses its savepoint and bumps the row the other one created
+        try:
+            with db.session.begin_nested():
+                db.session.add(GalleryRevision(college_id=college_id, revision=0))
+        except IntegrityError:
+            pass
+    db.session.execute(
+        db.update(GalleryRevision)
+        .where(GalleryRevision.college_id == college_id)
+        .values(revision=GalleryRevision.revision + 1)
+    )
+    return gallery_revision(college_id)
+
+def college_face_system(college_id):
+    """Return the face system with an up-to-date college gallery.
+    
+    The worker that changes a student patches its own gallery; other worker
+    processes see the bumped GalleryRevision and reload from the database.
+    """
+    face_system = get_face_system()
+    # Recognition nodes are shared by every worker, so only in-process galleries can go stale
+    revision = None if app.config['RECOGNITION_NODES'] else gallery_revision(college_id)
+    if not face_system.has_gallery(college_id) or _gallery_revisions.get(college_id) != revision:
+        with gallery_lock(college_id):
+            if not face_system.has_gallery(college_id) or _gallery_revisions.get(college_id) != revision:
+                with startup_profile.phase(f'load gallery for college {college_id}'):
+                    # Calibration first, so the gallery is published with it
+                    calibration = GalleryCalibration.query.filter_by(college_id=college_id).first()
+                    if calibration:
+                        face_system.set_calibration(college_id, calibration.threshold, calibration.margin)
+                    students = Student.query.filter_by(college_id=college_id).all()
+                    face_system.load_known_faces(students, college_id)
+                    _gallery_revisions[college_id] = revision
+    return face_system
+
+def patch_college_gallery(college_id, revision, patch):
+    """Apply a committed student change to this worker's gallery.
+    
+    In-process galleries are only patched when they were at the previous
+    revision; otherwise another worker changed the college in between and the
+    next request reloads it from the database instead.
+    """
+    if app.config['RECOGNITION_NODES']:
+        from recognition_client import GalleryNotLoadedError, RecognitionNodeError
+        try:
+            with gallery_lock(college_id):
+                patch()
+        except GalleryNotLoadedError:
+            # The node restarted and lost the gallery; the change is committed, so a full push includes it
+            college_face_system(college_id)
+        except RecognitionNodeError as e:
+            # The change is committed; the next request asks the node again and reloads if needed
+            print(f"⚠️  Could not patch the gallery of college {college_id} on its node: {e}")
+        return
+    with gallery_lock(college_id):
+        if _gallery_revisions.get(college_id) == revision - 1:
+            patch()
+            _gallery_revisions[college_id] = revision
+
+def with_college_gallery(college_id, action):
+    """Run action(face_system) against the college gallery.
+    
+    A recognition node that restarted without a database answers 409; the
+    gallery is pushed to it again and the action retried once.
+    """
+    face_system = college_face_system(college_id)
+    if not app.config['RECOGNITION_NODES']:
+        return action(face_system)
+    from recognition_client import GalleryNotLoadedError
+    try:
+        return action(face_system)
+    except GalleryNotLoadedError:
+        return action(college_face_system(college_id))
+
+def warm_up_recognition():
+    """Initialize recognition and load every college gallery in this process.
+    
+    Serving processes call it before taking traffic: gunicorn workers through
+    the post_fork hook in gunicorn.conf.py, python app.py directly, both when
+    COGNIFACE_WARMUP is set.
+    """
+    with app.app_context():
+        for college in College.query.all():
+            college_face_system(college.id)
+    print(startup_profile.report())
+
+@app.cli.command('warmup')
+def warmup_command():
+    """Time recognition init and gallery loads (warms only this CLI process, not server workers)"""
+    warm_up_recognition()
+
+# flask calibrate refuses thresholds that captures show rejecting more genuine frames than this
+MAX_CALIBRATED_FRR = 0.5
+
+@app.cli.command('calibrate')
+@click.argument('college_id', type=int)
+@click.option('--captures', type=click.Path(exists=True, file_okay=False),
+              help='Directory of multi-frame captures laid out as <student_id>/<frame>.jpg')
+@click.option('--target-far', default=0.001, show_default=True, help='Highest acceptable false accept rate per 1:N search')
+def calibrate_command(college_id, captures, target_far):
+    """Fit and store the recognition threshold and margin of a college"""
+    from calibration import calibrate_gallery, load_captures
+    from face_recognition_system import FaceRecognitionSystem
+    
+    # Calibrate on an in-process gallery built the same way recognition builds it
+    face_system = FaceRecognitionSystem()
+    face_system.load_known_faces(Student.query.filter_by(college_id=college_id).all(), college_id)
+    gallery = face_system.get_gallery(college_id)
+    capture_encodings = load_captures(face_system, captures) if captures else {}
+    
+    try:
+        result = calibrate_gallery(gallery, capture_encodings, target_far=target_far)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if result['duplicate_count']:
+        print(f"⚠️  Left out {result['duplicate_count']} student(s) enrolled with a near-identical face; "
+              f"see flask find-duplicates {college_id}")
+    # Storing an unusable threshold would make the college recognize nobody
+    if result['threshold'] <= 0:
+        raise click.ClickException(f"Fitted threshold {result['threshold']:.4f} would reject every face; not stored")
+    if result['frr'] is not None and result['frr'] > MAX_CALIBRATED_FRR:
+        raise click.ClickException(f"Captures show the fitted threshold rejecting {result['frr']:.0%} of genuine "
+                                   f"frames (more than {MAX_CALIBRATED_FRR:.0%}); not stored")
+    
+    db.create_all()
+    calibration = GalleryCalibration.query.filter_by(college_id=college_id).first()
+    if calibration is None:
+        calibration = GalleryCalibration(college_id=college_id)
+        db.session.add(calibration)
+    calibration.threshold = result['threshold']
+    calibration.margin = result['margin']
+    calibration.far = result['far']
+    calibration.frr = result['frr']
+    calibration.genuine_count = result['genuine_count']
+    calibration.impostor_count = result['impostor_count']
+    calibration.calibrated_at = datetime.utcnow()
+    # In-process workers reload the gallery with the new values on their next request
+    bump_gallery_revision(college_id)
+    db.session.commit()
+    
+    # Running recognition nodes pick the new values up right away
+    if app.config['RECOGNITION_NODES']:
+        get_face_system().set_calibration(college_id, result['threshold'], result['margin'])
+    
+    print(f"📊 Calibration for college {college_id}:")
+    print(f"  threshold: {result['threshold']:.4f}  margin: {result['margin']:.4f}")
+    print(f"  FAR per 1:N search: {result['far']:.6f} over {result['probe_count']} probes")
+    print(f"  FAR per pair: {result['pairwise_far']:.6f} over {result['impostor_count']} impostor pairs")
+    if result['frr'] is not None:
+        print(f"  FRR: {result['frr']:.4f} over {result['genuine_count']} genuine frames "
+              f"(~{result['frames_per_checkin']:.2f} frames per check-in)")
+    else:
+        print("  FRR: not measured (no captures given)")
+
+@app.cli.command('find-duplicates')
+@click.argument('college_id', type=int)
+@click.option('--threshold', type=float, help='Distance below which two students count as duplicates '
+                                                 '(defaults to the recognition threshold)')
+@click.option('--output', type=click.File('w'), help='Write the pairs to a CSV file')
+def find_duplicates_command(college_id, threshold, output):
+    """Find near-duplicate face pairs across a college gallery"""
+    import csv
+    from duplicate_scan import find_near_duplicate_pairs
+    from face_recognition_system import FaceRecognitionSystem
+    
+    face_system = FaceRecognitionSystem()
+    face_system.load_known_faces(Student.query.filter_by(college_id=college_id).all(), college_id)
+    gallery = face_system.get_gallery(college_id)
+    if threshold is None:
+        calibration = GalleryCalibration.query.filter_by(college_id=college_id).first()
+        threshold = calibration.threshold if calibration else face_system.recognition_threshold
+    
+    with startup_profile.phase(f'duplicate scan of {len(gallery)} students'):
+        pairs = find_near_duplicate_pairs(gallery, threshold)
+    
+    print(f"🔍 {len(pairs)} near-duplicate pair(s) below distance {threshold:.4f}")
+    for first, second, distance in pairs[:50]:
+        print(f"  {first} <-> {second}  distance {distance:.4f}")
+    if output:
+        writer = csv.writer(output)
+        writer.writerow(['student_id_1', 'student_id_2', 'distance'])
+        writer.writerows(pairs)
+    print(startup_profile.report())
+
+@app.cli.command('close-day')
+@click.option('--date', 'day', type=click.DateTime(['%Y-%m-%d']), help='Close a single day')
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First day of a backfill range')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), help='Last day of a backfill range (defaults to yesterday)')
+@click.option('--college-id', type=int, help='Only close days of one college')
+def close_day_command(day, start, end, college_id):
+    """Close open attendance sessions and write the daily status table.
+    
+    Without options every day from the earliest unclosed one up to yesterday is closed.
+    """
+    from daily_status import close_days, pending_range
+    
+    db.create_all()
+    today = datetime.utcnow().date()
+    if day:
+        start_date = end_date = day.date()
+    elif start:
+        start_date = start.date()
+        end_date = end.date() if end else today - timedelta(days=1)
+    else:
+        days = pending_range(today, college_id)
+        if days is None:
+            print("✅ Every past day is already closed")
+            return
+        start_date, end_date = days
+    if end_date >= today:
+        raise click.ClickException("Only days before today can be closed")
+    if start_date > end_date:
+        raise click.ClickException("--start must not be after --end")
+    
+    with startup_profile.phase(f'close attendance {start_date} to {end_date}'):
+        result = close_days(start_date, end_date, college_id)
+    print(f"✅ Closed {start_date} to {end_date}: {result['closed_sessions']} open session(s) marked ABSENT, "
+          f"{result['daily_rows']} daily status row(s) written")
+    print(startup_profile.report())
+
+@app.cli.command('prune-uploads')
+@click.option('--min-age', default=24.0, show_default=True, help='Keep unreferenced uploads younger than this many hours')
+def prune_uploads_command(min_age):
+    """Delete stored student photos that no student references"""
+    from image_ingest import prune_uploads
+    
+    referenced = [path for (path,) in db.session.query(Student.photo_path)]
+    removed = prune_uploads(app.config['UPLOAD_FOLDER'], referenced, min_age * 3600)
+    print(f"✅ Removed {len(removed)} unreferenced upload(s)")
+
+@app.cli.command('startup-profile')
+def startup_profile_command():
+    """Print how long each startup phase of this process took"""
+    print(startup_profile.report())
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -82,11 +357,14 @@ def test_recognition(student_id):
     # Test with the student's own photo
     if student.photo_path and os.path.exists(student.photo_path):
         # Load test image
-        test_image = cv2.imread(student.photo_path)
+        with open(student.photo_path, 'rb') as f:
+            test_image = f.read()
         
-        if test_image is not None:
+        try:
             # Test recognition on the same photo (should match perfectly)
-            face_names, face_locations = face_system.recognize_face(test_image)
+            face_names, face_locations = with_college_gallery(
+                current_user.college_id,
+                lambda face_system: face_system.recognize_face_data(test_image, current_user.college_id))
             
             result = {
                 'student': student,
@@ -95,7 +373,7 @@ def test_recognition(student_id):
                 'recognition_result': face_names,
                 'distance_info': 'Test completed'
             }
-        else:
+        except ValueError:
             result = {
                 'student': student,
                 'test_image_loaded': False,
@@ -115,6 +393,7 @@ def test_recognition(student_id):
 def reencode_all_faces():
     """Re-encode all faces with the new system"""
     students = Student.query.filter_by(college_id=current_user.college_id).all()
+    face_system = get_face_system()
     
     success_count = 0
     failed_count = 0
@@ -130,11 +409,12 @@ def reencode_all_faces():
                 failed_count += 1
                 print(f"❌ Failed: {student.name}")
     
+    revision = bump_gallery_revision(current_user.college_id)
     db.session.commit()
     
     # Reload known faces
-    students = Student.query.filter_by(college_id=current_user.college_id).all()
-    face_system.load_known_faces(students)
+    patch_college_gallery(current_user.college_id, revision,
+                          lambda: face_system.load_known_faces(students, current_user.college_id))
     
     flash(f'Re-encoded {success_count} faces successfully. {failed_count} failed.', 'success')
     return redirect(url_for('debug_students'))
@@ -148,10 +428,7 @@ def login_post():
     if admin and admin.check_password(password):
         login_user(admin)
         
-        # Load face encodings for this college after login
-        students = Student.query.filter_by(college_id=admin.college_id).all()
-        face_system.load_known_faces(students)
-        
+        # Face encodings are loaded on the first recognition request
         return redirect(url_for('dashboard'))
     else:
         flash('Invalid credentials', 'error')
@@ -161,17 +438,17 @@ def login_post():
 @login_required
 def dashboard():
     college = current_user.college
-    students = Student.query.filter_by(college_id=college.id).all()
-    today_attendance = Attendance.query.join(Student).filter(
+    # Today is never closed yet, so count its raw rows instead of loading them
+    present_today = Attendance.query.join(Student).filter(
         Student.college_id == college.id,
         Attendance.date == datetime.utcnow().date()
-    ).all()
+    ).count()
     
     return render_template('dashboard.html',
                          college=college,
-                         total_students=len(students),
-                         present_today=len(today_attendance),
-                         students=students[:5])
+                         total_students=Student.query.filter_by(college_id=college.id).count(),
+                         present_today=present_today,
+                         students=Student.query.filter_by(college_id=college.id).limit(5).all())
 
 @app.route('/add-student', methods=['GET', 'POST'])
 @login_required
@@ -181,21 +458,36 @@ def add_student():
         name = request.form.get('name')
         email = request.form.get('email')
         photo = request.files.get('photo')
+        # Set when the form comes back after a duplicate warning, so the photo need not be chosen again
+        content_hash = request.form.get('content_hash')
         
-        if photo and student_id and name:
-            # Create uploads directory if it doesn't exist
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-            
-            filename = secure_filename(f"{student_id}_{photo.filename}")
-            photo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        if (photo or content_hash) and student_id and name:
+            from image_ingest import IngestError, ingest_upload, reuse_upload
+            face_system = college_face_system(current_user.college_id)
             
-            # Save the photo
-            photo.save(photo_path)
-            print(f"✅ Photo saved to: {photo_path}")
-            print(f"✅ Photo exists: {os.path.exists(photo_path)}")
+            # Store a bounded master by content hash and encode from the decoded image
+            try:
+                if photo:
+                    ingested = ingest_upload(photo.stream, app.config['UPLOAD_FOLDER'], face_system,
+                                             max_bytes=app.config['MAX_CONTENT_LENGTH'])
+                else:
+                    ingested = reuse_upload(content_hash, app.config['UPLOAD_FOLDER'], face_system)
+            except IngestError as e:
+                flash(f'Could not read the uploaded photo: {e}', 'error')
+                return render_template('add_student.html', college=current_user.college, form=request.form)
+            photo_path = ingested['photo_path']
+            face_encoding = ingested['face_encoding']
             
-            # Encode face
-            face_encoding = face_system.encode_face(photo_path)
+            # Flag faces already enrolled under another student ID before committing
+            if face_encoding and not request.form.get('allow_duplicate'):
+                duplicates = with_college_gallery(current_user.college_id,
+                                                  lambda face_system: face_system.find_duplicates(face_encoding, current_user.college_id))
+                duplicates = [d for d in duplicates if d['student_id'] != student_id]
+                if duplicates:
+                    matches = ', '.join(f"{d['name']} ({d['student_id']}, distance {d['distance']:.3f})" for d in duplicates)
+                    flash(f'This face looks like an already enrolled student: {matches}. Check for a duplicate enrollment, or tick "Enroll anyway" to add {name}.', 'error')
+                    return render_template('add_student.html', college=current_user.college, form=request.form,
+                                           duplicates=duplicates, content_hash=ingested['content_hash'])
             
             if face_encoding is None:
                 flash(f'Warning: Could not detect face in the uploaded photo for {name}. Student was added but face recognition may not work. Please try with a clearer front-facing photo.', 'warning')
@@ -210,11 +502,11 @@ def add_student():
             )
             
             db.session.add(student)
+            revision = bump_gallery_revision(current_user.college_id)
             db.session.commit()
             
-            # Reload known faces for current college
-            students = Student.query.filter_by(college_id=current_user.college_id).all()
-            face_system.load_known_faces(students)
+            # Add the new student to the loaded gallery
+            patch_college_gallery(current_user.college_id, revision, lambda: face_system.add_student(student))
             
             if face_encoding:
                 flash(f'Student {name} added successfully with face encoding!', 'success')
@@ -278,16 +570,13 @@ def recognize_face():
         if not image_data:
             return jsonify({'success': False, 'error': 'No image data'})
         
-        # Convert base64 to image
+        # Convert base64 to image bytes; decoding happens where recognition runs
         format, imgstr = image_data.split(';base64,')
-        nparr = np.frombuffer(base64.b64decode(imgstr), np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if frame is None:
-            return jsonify({'success': False, 'error': 'Could not decode image'})
         
         # Recognize face
-        face_names, face_locations = face_system.recognize_face(frame)
+        face_names, face_locations = with_college_gallery(
+            current_user.college_id,
+            lambda face_system: face_system.recognize_face_data(base64.b64decode(imgstr), current_user.college_id))
         
         if face_names and face_names[0] != "Unknown":
             student_id = face_names[0]
@@ -329,17 +618,31 @@ def recognize_face():
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/recognition-metrics')
+@login_required
+def recognition_metrics():
+    """Recognition cache hit rate for the current college"""
+    try:
+        # Report without initializing recognition in a worker that has not recognized anything yet
+        stats = _face_system.cache_stats(current_user.college_id) if _face_system is not None else None
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+    return jsonify({'success': True, 'college_id': current_user.college_id, 'cache': stats})
+
 @app.route('/attendance-report')
 @login_required
 def attendance_report():
+    from daily_status import attendance_summary
+    
     college = current_user.college
     students = Student.query.filter_by(college_id=college.id).all()
+    # Closed days come precomputed from the daily status table
+    summary = attendance_summary(college.id)
     
     attendance_data = []
     for student in students:
-        attendances = Attendance.query.filter_by(student_id=student.id).all()
-        total_days = len(attendances)
-        present_days = len([a for a in attendances if a.status == 'PRESENT'])
+        total_days, present_days = summary.get(student.id, (0, 0))
         
         percentage = round((present_days / total_days * 100) if total_days > 0 else 0, 2)
         
@@ -354,6 +657,29 @@ def attendance_report():
                          attendance_data=attendance_data,
                          college=college)
 
+@app.route('/attendance-export.<fmt>')
+@login_required
+def export_attendance(fmt):
+    """Stream the college's attendance as CSV or JSON, optionally between ?start= and ?end= (YYYY-MM-DD)"""
+    from attendance_export import attendance_rows, stream_csv, stream_json
+    
+    streams = {'csv': (stream_csv, 'text/csv'), 'json': (stream_json, 'application/json')}
+    if fmt not in streams:
+        abort(404)
+    
+    try:
+        start_date = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else None
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Dates must be formatted as YYYY-MM-DD'}), 400
+    
+    stream, mimetype = streams[fmt]
+    rows = attendance_rows(current_user.college_id, start_date, end_date)
+    # College codes are free text, so keep only characters that are safe in a header
+    filename = secure_filename(f"attendance_{current_user.college.code}_{start_date or 'all'}_{end_date or 'all'}.{fmt}")
+    return Response(stream_with_context(stream(rows)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
 @app.route('/debug-students')
 @login_required
 def debug_students():
@@ -391,7 +717,7 @@ def debug_face(student_id):
     
     if debug_info['photo_exists']:
         # Test encoding with the improved system
-        test_encoding = face_system.encode_face(student.photo_path)
+        test_encoding = get_face_system().encode_face(student.photo_path)
         debug_info['test_encoding_success'] = bool(test_encoding)
         debug_info['test_encoding'] = test_encoding
     
@@ -407,15 +733,16 @@ def reencode_face(student_id):
     
     if student.photo_path and os.path.exists(student.photo_path):
         # Re-encode face
+        face_system = college_face_system(current_user.college_id)
         face_encoding = face_system.encode_face(student.photo_path)
         
         if face_encoding:
             student.face_encoding = face_encoding
+            revision = bump_gallery_revision(current_user.college_id)
             db.session.commit()
             
-            # Reload known faces
-            students = Student.query.filter_by(college_id=current_user.college_id).all()
-            face_system.load_known_faces(students)
+            # Patch the student's row in the loaded gallery
+            patch_college_gallery(current_user.college_id, revision, lambda: face_system.update_student(student))
             
             flash(f'Face re-encoded successfully for {student.name}!', 'success')
         else:
@@ -476,12 +803,6 @@ def logout():
     logout_user()
     return redirect(url_for('login'))
 
-@app.before_request
-def load_face_data():
-    """Load face encodings for the current user's college"""
-    if current_user.is_authenticated:
-        students = Student.query.filter_by(college_id=current_user.college_id).all()
-        face_system.load_known_faces(students)
 if __name__ == '__main__':
     # Initialize database
     init_db()
@@ -495,34 +816,7 @@ if __name__ == '__main__':
     print("  Camera Test: http://127.0.0.1:5000/test-camera")
     print("  Student Debug: http://127.0.0.1:5000/debug-students")
     
-    app.run(debug=True, host='127.0.0.1', port=5000)
-
-# Start Flask shell
-# flask shell
-
-from app import db, Student, face_system
-from improved_face_recognition import WorkingFaceRecognitionSystem
-
-# Get your student
-student = Student.query.filter_by(student_id='23241-cs-046').first()
-
-if student and student.photo_path:
-    print(f"Re-encoding face for: {student.name}")
+    if os.environ.get('COGNIFACE_WARMUP'):
+        warm_up_recognition()
     
-    # Use the new system
-    new_system = WorkingFaceRecognitionSystem()
-    new_encoding = new_system.encode_face(student.photo_path)
-    
-    if new_encoding:
-        student.face_encoding = new_encoding
-        db.session.commit()
-        print("✅ Face re-encoded successfully!")
-        
-        # Reload known faces
-        students = Student.query.all()
-        new_system.load_known_faces(students)
-        print("✅ Known faces reloaded!")
-    else:
-        print("❌ Face encoding failed!")
-else:
-    print("❌ Student or photo not found!")
\ No newline at end of file
+    app.run(debug=True, host='127.0.0.1', port=5000)
@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+
+from database import db, Student, Attendance
+
+EXPORT_COLUMNS = ['student_id', 'name', 'date', 'check_in', 'check_out', 'duration_seconds', 'status']
+
+
+def attendance_rows(college_id, start_date=None, end_date=None, chunk_size=1000):
+    """Iterate over a college's attendance joined with students in constant memory.
+
+    Only the exported columns are selected and rows are fetched through a
+    server-side cursor chunk_size at a time, so a year of attendance never has
+    to fit in memory.
+    """
+    query = db.session.query(
+        Student.student_id,
+        Student.name,
+        Attendance.date,
+        Attendance.check_in,
+        Attendance.check_out,
+        Attendance.duration,
+        Attendance.status
+    ).join(Student, Attendance.student_id == Student.id).filter(Student.college_id == college_id)
+
+    if start_date:
+        query = query.filter(Attendance.date >= start_date)
+    if end_date:
+        query = query.filter(Attendance.date <= end_date)
+
+    query = query.order_by(Attendance.date, Attendance.id)
+    for student_id, name, date, check_in, check_out, duration, status in \
+            query.execution_options(stream_results=True).yield_per(chunk_size):
+        yield {
+            'student_id': student_id,
+            'name': name,
+            'date': date.isoformat() if date else None,
+            'check_in': check_in.isoformat() if check_in else None,
+            'check_out': check_out.isoformat() if check_out else None,
+            'duration_seconds': int(duration.total_seconds()) if duration is not None else None,
+            'status': status
+        }
+
+
+def stream_csv(rows, chunk_size=1000):
+    """Yield CSV text a chunk of rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_json(rows, chunk_size=1000):
+    """Yield a JSON array a chunk of rows at a time"""
+    parts = ['[']
+    for count, row in enumerate(rows):
+        parts.append((',' if count else '') + json.dumps(row))
+        if len(parts) >= chunk_size:
+            yield ''.join(parts)
+            parts = []
+    parts.append(']')
+    yield ''.join(parts)
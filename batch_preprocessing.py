@@ -0,0 +1,76 @@
+import cv2
+import numpy as np
+
+
+class BatchPreprocessor:
+    """Preprocess every face box of a frame (or micro-batch of frames) in one pass.
+
+    Each crop is resized, equalized and blurred through fixed scratch buffers
+    and written straight into a preallocated (k x D) float32 encoding buffer,
+    so there are no per-step temporaries. The returned encodings and crops are
+    views into those buffers and stay valid until the next call; use one
+    preprocessor per thread.
+    """
+
+    def __init__(self, size=(100, 100), equalize=True, blur=True, unit_normalize=True, capacity=8):
+        self.size = size
+        self.equalize = equalize
+        self.blur = blur
+        self.unit_normalize = unit_normalize
+        width, height = size
+        self._resized = np.empty((height, width), dtype=np.uint8)
+        self._norms = None
+        self._allocate(capacity)
+
+    @property
+    def dim(self):
+        return self.size[0] * self.size[1]
+
+    def process(self, gray, boxes):
+        """Encode the (x, y, w, h) boxes of one grayscale frame.
+
+        Returns (encodings, crops): a (k x D) float32 view and the matching
+        (k x H x W) uint8 preprocessed crops.
+        """
+        return self.process_batch([(gray, boxes)])
+
+    def process_batch(self, frames):
+        """Encode the boxes of several (gray, boxes) frames into consecutive rows"""
+        total = sum(len(boxes) for _, boxes in frames)
+        if total > len(self._encodings):
+            self._allocate(max(total, 2 * len(self._encodings)))
+
+        row = 0
+        for gray, boxes in frames:
+            for (x, y, w, h) in boxes:
+                self._preprocess_crop(gray[y:y+h, x:x+w], row)
+                row += 1
+
+        encodings = self._encodings[:row]
+        if self.unit_normalize and row:
+            norms = self._norms[:row]
+            np.einsum('ij,ij->i', encodings, encodings, out=norms)
+            np.sqrt(norms, out=norms)
+            norms[norms == 0] = 1.0
+            encodings /= norms[:, None]
+        return encodings, self._crops[:row]
+
+    def _preprocess_crop(self, roi, row):
+        crop = self._crops[row]
+        if self.blur:
+            # Resize (and equalize) in scratch, then blur into the crop slot
+            cv2.resize(roi, self.size, dst=self._resized)
+            if self.equalize:
+                cv2.equalizeHist(self._resized, dst=self._resized)
+            cv2.GaussianBlur(self._resized, (3, 3), 0, dst=crop)
+        else:
+            cv2.resize(roi, self.size, dst=crop)
+            if self.equalize:
+                cv2.equalizeHist(crop, dst=crop)
+        np.divide(crop.reshape(-1), 255.0, out=self._encodings[row], casting='unsafe')
+
+    def _allocate(self, capacity):
+        width, height = self.size
+        self._crops = np.empty((capacity, height, width), dtype=np.uint8)
+        self._encodings = np.empty((capacity, width * height), dtype=np.float32)
+        self._norms = np.empty(capacity, dtype=np.float32)
@@ -0,0 +1,92 @@
+"""Benchmark face detection cascades and face preprocessing.
+
+Compares the Haar and LBP frontal face cascades on the same frames, and
+per-crop preprocess_face() against the batched preprocessing engine:
+
+    python benchmark_detection.py                      # synthetic 640x480 frames
+    python benchmark_detection.py photos/*.jpg --repeat 20
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+
+from batch_preprocessing import BatchPreprocessor
+from face_detectors import DETECTOR_CASCADES, find_cascade, load_cascade
+from improved_face_recognition import ImprovedFaceRecognitionSystem
+
+
+def load_frames(paths, count, size=(640, 480)):
+    if paths:
+        frames = [cv2.imread(path) for path in paths]
+        return [frame for frame in frames if frame is not None]
+    rng = np.random.default_rng(0)
+    width, height = size
+    return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def time_per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def benchmark_detectors(grays, repeat):
+    print(f"Detection over {len(grays)} frame(s), {repeat} run(s):")
+    for name, filename in DETECTOR_CASCADES.items():
+        if find_cascade(filename) is None:
+            print(f"  {name:<6} skipped ({filename} not installed; set COGNIFACE_CASCADE_DIR)")
+            continue
+        cascade = load_cascade(filename)
+        seconds, faces = time_per_call(
+            lambda: [cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)) for gray in grays],
+            repeat
+        )
+        found = sum(len(f) for f in faces)
+        print(f"  {name:<6} {seconds / len(grays) * 1000:8.2f} ms/frame  {found} face(s) found")
+
+
+def benchmark_preprocessing(grays, faces_per_frame, repeat):
+    rng = np.random.default_rng(1)
+    frames = []
+    for gray in grays:
+        height, width = gray.shape
+        boxes = []
+        for _ in range(faces_per_frame):
+            side = int(rng.integers(60, min(height, width) // 2))
+            boxes.append((int(rng.integers(0, width - side)), int(rng.integers(0, height - side)), side, side))
+        frames.append((gray, boxes))
+    crops = sum(len(boxes) for _, boxes in frames)
+
+    system = ImprovedFaceRecognitionSystem()
+    per_crop, expected = time_per_call(
+        lambda: [system.preprocess_face(gray[y:y+h, x:x+w]) for gray, boxes in frames for (x, y, w, h) in boxes],
+        repeat
+    )
+    preprocessor = BatchPreprocessor(capacity=crops)
+    batched, (encodings, _) = time_per_call(lambda: preprocessor.process_batch(frames), repeat)
+
+    difference = float(np.abs(np.stack(expected) - encodings).max()) if crops else 0.0
+    print(f"Preprocessing {crops} crop(s), {repeat} run(s):")
+    print(f"  per-crop {per_crop / crops * 1e6:8.1f} us/crop")
+    print(f"  batched  {batched / crops * 1e6:8.1f} us/crop  ({per_crop / batched:.2f}x, max difference {difference:.2e})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark face detection and preprocessing')
+    parser.add_argument('images', nargs='*', help='Frames to use instead of synthetic ones')
+    parser.add_argument('--frames', type=int, default=10, help='Number of synthetic frames')
+    parser.add_argument('--faces', type=int, default=4, help='Face boxes per frame for preprocessing')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in load_frames(args.images, args.frames)]
+    if not grays:
+        parser.error('no readable frames')
+    benchmark_detectors(grays, args.repeat)
+    benchmark_preprocessing(grays, args.faces, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
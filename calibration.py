@@ -0,0 +1,140 @@
+import os
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def impostor_histogram(gallery, bins=4096, tile_size=1024):
+    """Impostor distances of a gallery, pairwise and per 1:N search.
+
+    Every student is used as a probe against the rest of the gallery, which
+    is what recognition and the enrollment duplicate check do. Rows are
+    matched tile by tile with the vectorized matcher, so memory stays bounded
+    by tile_size x N no matter how large the college is.
+    Returns (counts, bin_edges, nearest): the histogram of the distances
+    between every pair of different students, and each student's distance
+    to its nearest other student.
+    """
+    encodings = gallery.encodings
+    n = len(encodings)
+    if n < 2:
+        raise ValueError("calibration needs at least two enrolled students")
+
+    # No two encodings can be further apart than twice the largest norm
+    upper = 2.0 * float(np.sqrt(gallery.sq_norms[:n].max())) or 1.0
+    edges = np.linspace(0.0, upper, bins + 1)
+    counts = np.zeros(bins, dtype=np.int64)
+    nearest = np.empty(n, dtype=np.float32)
+    columns = np.arange(n)
+    for start in range(0, n, tile_size):
+        stop = min(start + tile_size, n)
+        rows = np.arange(start, stop)
+        distances = gallery.distances(encodings[start:stop])
+        upper_triangle = columns[None, :] > rows[:, None]
+        counts += np.histogram(distances[upper_triangle], bins=edges)[0]
+        distances[rows - start, rows] = np.inf
+        nearest[start:stop] = distances.min(axis=1)
+    return counts, edges, nearest
+
+
+def genuine_distances(gallery, captures):
+    """Distances of multi-frame captures to their own student and to everyone else.
+
+    captures maps student_id to a list of encodings taken from several frames
+    of that student. Returns (genuine, gaps) where gaps is how much closer each
+    frame is to its own student than to the nearest other student.
+    """
+    genuine, gaps = [], []
+    for student_id, encodings in captures.items():
+        row = gallery.index.get(student_id)
+        if row is None or not encodings:
+            continue
+        distances = gallery.distances(np.stack([gallery.parse_encoding(e) for e in encodings]))
+        own = distances[:, row].copy()
+        distances[:, row] = np.inf
+        genuine.append(own)
+        gaps.append(distances.min(axis=1) - own)
+    if not genuine:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
+    return np.concatenate(genuine), np.concatenate(gaps)
+
+
+def fit_threshold(counts, edges, nearest, genuine=None, gaps=None, target_far=0.001, margin_quantile=0.05,
+                  duplicate_ratio=0.05):
+    """Pick the largest threshold whose 1:N false accept rate stays within target_far.
+
+    A search against N students falsely accepts when any of them is under
+    the threshold, so the rate is taken from each probe's nearest impostor
+    rather than from single pairs (a pairwise rate p gives about 1-(1-p)^N
+    per search). The pairwise rate is reported alongside it.
+
+    Students closer to another student than duplicate_ratio of the median
+    nearest-impostor distance are the same face enrolled twice (see
+    find-duplicates), not impostors, and are left out; otherwise a single
+    duplicate enrollment would pull the threshold down to zero.
+
+    The margin is the gap that margin_quantile of genuine frames fall below,
+    so ambiguous frames are rejected without rejecting most genuine ones.
+    """
+    nearest = np.sort(nearest)
+    duplicate_floor = duplicate_ratio * float(np.median(nearest))
+    duplicate_count = int(np.count_nonzero(nearest <= duplicate_floor))
+    nearest = nearest[nearest > duplicate_floor]
+    if not len(nearest):
+        raise ValueError("every enrolled face has a duplicate; nothing to calibrate against")
+    # At most this many probes may have an impostor strictly under the threshold
+    allowed = min(int(target_far * len(nearest)), len(nearest) - 1)
+    threshold = float(nearest[allowed])
+    far = float(np.mean(nearest < threshold))
+
+    impostor_count = int(counts.sum())
+    cut = int(np.searchsorted(edges, threshold, side='right')) - 1
+    pairwise_far = float(counts[:cut].sum() / impostor_count)
+
+    result = {
+        'threshold': threshold,
+        'margin': 0.0,
+        'far': far,
+        'pairwise_far': pairwise_far,
+        'probe_count': int(len(nearest)),
+        'duplicate_count': duplicate_count,
+        'frr': None,
+        'frames_per_checkin': None,
+        'genuine_count': 0,
+        'impostor_count': impostor_count,
+    }
+    if genuine is not None and len(genuine):
+        margin = max(0.0, float(np.quantile(gaps, margin_quantile)))
+        rejected = (genuine >= threshold) | (gaps < margin)
+        frr = float(rejected.mean())
+        result.update({
+            'margin': margin,
+            'frr': frr,
+            # Expected frames a kiosk needs before a genuine student is accepted
+            'frames_per_checkin': 1.0 / (1.0 - frr) if frr < 1.0 else float('inf'),
+            'genuine_count': int(len(genuine)),
+        })
+    return result
+
+
+def calibrate_gallery(gallery, captures=None, target_far=0.001):
+    """Fit a threshold and margin for one college gallery and report FAR/FRR"""
+    counts, edges, nearest = impostor_histogram(gallery)
+    genuine, gaps = genuine_distances(gallery, captures or {})
+    return fit_threshold(counts, edges, nearest, genuine, gaps, target_far=target_far)
+
+
+def load_captures(face_system, directory):
+    """Encode a directory of multi-frame captures laid out as <student_id>/<frame>.jpg"""
+    captures = {}
+    for student_id in sorted(os.listdir(directory)):
+        student_dir = os.path.join(directory, student_id)
+        if not os.path.isdir(student_dir):
+            continue
+        for filename in sorted(os.listdir(student_dir)):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            encoding = face_system.encode_face(os.path.join(student_dir, filename))
+            if encoding:
+                captures.setdefault(student_id, []).append(encoding)
+    return captures
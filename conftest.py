@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+import pytest
+
+# app.py reads DATABASE_URL at import time, so point it at a scratch database first
+_database_dir = tempfile.mkdtemp(prefix='cogniface-test-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_database_dir, 'test.db')}"
+
+
+@pytest.fixture
+def cogniface_app():
+    """The Flask app module inside an app context, with empty tables"""
+    import app as cogniface
+    from database import db
+
+    with cogniface.app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield cogniface
+        db.session.remove()
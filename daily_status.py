@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, func, insert, select, update
+
+from database import db, College, Student, Attendance, ClosedAttendanceDay, DailyAttendanceStatus
+
+
+def _college_filter(column, college_id):
+    """Restrict an attendance student_id column to one college"""
+    return column.in_(select(Student.id).where(Student.college_id == college_id))
+
+
+def _day_closed(college_id_column):
+    """EXISTS clause for the attendance row's day being closed for its college"""
+    return select(ClosedAttendanceDay.id).where(
+        ClosedAttendanceDay.college_id == college_id_column,
+        ClosedAttendanceDay.date == Attendance.date
+    ).exists()
+
+
+def pending_range(today, college_id=None):
+    """(start, end) from the earliest unclosed day with attendance up to yesterday, or None"""
+    query = (
+        select(func.min(Attendance.date))
+        .join(Student, Attendance.student_id == Student.id)
+        .where(Attendance.date < today, ~_day_closed(Student.college_id))
+    )
+    if college_id is not None:
+        query = query.where(Student.college_id == college_id)
+    start = db.session.scalar(query)
+    end = today - timedelta(days=1)
+    if start is None or start > end:
+        return None
+    return start, end
+
+
+def close_days(start_date, end_date, college_id=None):
+    """Close every attendance day between start_date and end_date (inclusive).
+
+    Runs as set-based statements instead of touching rows one by one:
+    sessions that were never checked out are marked ABSENT (the 6 hour rule
+    cannot be met without a check-out), the daily status rows of the range
+    are deleted and then rebuilt with one INSERT ... SELECT ... GROUP BY.
+    Every day of the range is recorded as closed for each college, so closed
+    days need not be contiguous. Re-running a range is safe, so the same
+    call backfills history.
+    """
+    in_range = [Attendance.date >= start_date, Attendance.date <= end_date]
+    daily_in_range = [DailyAttendanceStatus.date >= start_date, DailyAttendanceStatus.date <= end_date]
+    closed_in_range = [ClosedAttendanceDay.date >= start_date, ClosedAttendanceDay.date <= end_date]
+    if college_id is not None:
+        in_range.append(_college_filter(Attendance.student_id, college_id))
+        daily_in_range.append(DailyAttendanceStatus.college_id == college_id)
+        closed_in_range.append(ClosedAttendanceDay.college_id == college_id)
+
+    closed = db.session.execute(
+        update(Attendance)
+        .where(Attendance.check_out.is_(None), Attendance.status != 'ABSENT', *in_range)
+        .values(status='ABSENT')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    db.session.execute(
+        delete(DailyAttendanceStatus)
+        .where(*daily_in_range)
+        .execution_options(synchronize_session=False)
+    )
+
+    present = func.max(case((Attendance.status == 'PRESENT', 1), else_=0))
+    checked_out = func.max(case((Attendance.check_out.isnot(None), 1), else_=0))
+    days = (
+        select(
+            Student.college_id,
+            Attendance.student_id,
+            Attendance.date,
+            case((present == 1, 'PRESENT'), else_='ABSENT'),
+            checked_out == 1,
+            func.count(Attendance.id)
+        )
+        .join(Student, Attendance.student_id == Student.id)
+        .where(*in_range)
+        .group_by(Student.college_id, Attendance.student_id, Attendance.date)
+    )
+    written = db.session.execute(
+        insert(DailyAttendanceStatus).from_select(
+            ['college_id', 'student_id', 'date', 'status', 'checked_out', 'sessions'], days)
+    ).rowcount
+
+    db.session.execute(
+        delete(ClosedAttendanceDay)
+        .where(*closed_in_range)
+        .execution_options(synchronize_session=False)
+    )
+    college_ids = [college_id] if college_id is not None else db.session.scalars(select(College.id)).all()
+    closed_at = datetime.utcnow()
+    days_closed = [
+        {'college_id': closed_college_id, 'date': start_date + timedelta(days=offset), 'closed_at': closed_at}
+        for closed_college_id in college_ids
+        for offset in range((end_date - start_date).days + 1)
+    ]
+    if days_closed:
+        db.session.execute(insert(ClosedAttendanceDay), days_closed)
+
+    db.session.commit()
+    return {'closed_sessions': closed, 'daily_rows': written}
+
+
+def attendance_summary(college_id):
+    """Map each student's primary key to (total_days, present_days) for a college.
+
+    Closed days are aggregated from the daily status table; only the days
+    not closed yet are read from raw attendance rows.
+    """
+    summary = {}
+    daily = (
+        select(
+            DailyAttendanceStatus.student_id,
+            func.count(DailyAttendanceStatus.id),
+            func.sum(case((DailyAttendanceStatus.status == 'PRESENT', 1), else_=0))
+        )
+        .where(DailyAttendanceStatus.college_id == college_id)
+        .group_by(DailyAttendanceStatus.student_id)
+    )
+    for student_id, total_days, present_days in db.session.execute(daily):
+        summary[student_id] = (total_days, present_days or 0)
+
+    raw = (
+        select(
+            Attendance.student_id,
+            func.count(Attendance.id),
+            func.sum(case((Attendance.status == 'PRESENT', 1), else_=0))
+        )
+        .join(Student, Attendance.student_id == Student.id)
+        .where(Student.college_id == college_id, ~_day_closed(college_id))
+        .group_by(Attendance.student_id)
+    )
+    for student_id, total_days, present_days in db.session.execute(raw):
+        closed_total, closed_present = summary.get(student_id, (0, 0))
+        summary[student_id] = (closed_total + total_days, closed_present + (present_days or 0))
+
+    return summary
@@ -41,7 +41,7 @@ class Attendance(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
     student = db.relationship('Student', backref=db.backref('attendances', lazy=True))
-    date = db.Column(db.Date, default=datetime.utcnow().date)
+    date = db.Column(db.Date, default=lambda: datetime.utcnow().date(), index=True)
     check_in = db.Column(db.DateTime, default=datetime.utcnow)
     check_out = db.Column(db.DateTime)
     duration = db.Column(db.Interval)
@@ -54,4 +54,50 @@ class Attendance(db.Model):
             if self.duration >= timedelta(hours=6):
                 self.status = 'PRESENT'
             else:
-                self.status = 'ABSENT'
\ No newline at end of file
+                self.status = 'ABSENT'
+
+class GalleryRevision(db.Model):
+    """Counter bumped with every change to a college's students or calibration.
+
+    Worker processes compare it with the revision they loaded their gallery
+    at to notice changes made by other workers.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    college_id = db.Column(db.Integer, db.ForeignKey('college.id'), unique=True, nullable=False)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+
+class ClosedAttendanceDay(db.Model):
+    """A day the close-day job has closed for a college, with or without attendance"""
+    __table_args__ = (db.UniqueConstraint('college_id', 'date'),)
+    id = db.Column(db.Integer, primary_key=True)
+    college_id = db.Column(db.Integer, db.ForeignKey('college.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    closed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class DailyAttendanceStatus(db.Model):
+    """One row per student and closed day, written by the close-day job"""
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'date'),
+        db.Index('ix_daily_attendance_status_college_date', 'college_id', 'date'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    college_id = db.Column(db.Integer, db.ForeignKey('college.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    student = db.relationship('Student', backref=db.backref('daily_statuses', lazy=True))
+    date = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    checked_out = db.Column(db.Boolean, default=False)
+    sessions = db.Column(db.Integer, default=1)
+
+class GalleryCalibration(db.Model):
+    """Recognition threshold and margin fitted for one college gallery"""
+    id = db.Column(db.Integer, primary_key=True)
+    college_id = db.Column(db.Integer, db.ForeignKey('college.id'), unique=True, nullable=False)
+    college = db.relationship('College', backref=db.backref('calibration', uselist=False))
+    threshold = db.Column(db.Float, nullable=False)
+    margin = db.Column(db.Float, default=0.0)
+    far = db.Column(db.Float)  # False accept rate of a 1:N search at the threshold
+    frr = db.Column(db.Float)  # False reject rate per frame, None without captures
+    genuine_count = db.Column(db.Integer, default=0)
+    impostor_count = db.Column(db.Integer, default=0)
+    calibrated_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+def principal_direction(gallery, iterations=20):
+    """Unit vector along which the gallery encodings spread the most (power iteration)"""
+    encodings = gallery.encodings
+    mean = encodings.mean(axis=0)
+    direction = np.random.default_rng(0).standard_normal(encodings.shape[1]).astype(np.float32)
+    for _ in range(iterations):
+        # (X - mean)^T (X - mean) v without materializing the centered matrix
+        projected = encodings @ direction - mean @ direction
+        direction = encodings.T @ projected - mean * projected.sum()
+        norm = np.linalg.norm(direction)
+        if norm == 0:
+            break
+        direction /= norm
+    return direction
+
+
+def find_near_duplicate_pairs(gallery, threshold, tile_size=1024):
+    """Find every pair of gallery students whose encodings are closer than threshold.
+
+    Students are sorted by their projection on the gallery's principal
+    direction, which is cached as a derived index. Two encodings can only be
+    within threshold of each other if their projections are too, so each
+    tile is compared only against the following tiles whose projections
+    overlap (blocking). Within a block the distances come from one matrix
+    product per tile. Returns (student_id, student_id, distance) sorted by
+    distance.
+    """
+    n = len(gallery)
+    if n < 2:
+        return []
+
+    direction = gallery.derived('principal_direction', principal_direction)
+    encodings = gallery.encodings
+    sq_norms = gallery.sq_norms[:n]
+    projections = encodings @ direction
+    order = np.argsort(projections)
+    projections = projections[order]
+
+    pairs = []
+    for start in range(0, n, tile_size):
+        stop = min(start + tile_size, n)
+        rows = order[start:stop]
+        tile = encodings[rows]
+        # Last sorted position that can still be within threshold of this tile
+        reach = int(np.searchsorted(projections, projections[stop - 1] + threshold, side='right'))
+        for block_start in range(start, reach, tile_size):
+            block_stop = min(block_start + tile_size, reach)
+            columns = order[block_start:block_stop]
+            sq = sq_norms[rows][:, None] + sq_norms[columns][None, :] - 2.0 * (tile @ encodings[columns].T)
+            close = sq < threshold * threshold
+            if block_start == start:
+                # Diagonal block: keep each pair once and skip self-matches
+                close &= np.triu(np.ones(close.shape, dtype=bool), k=1)
+            for i, j in zip(*np.nonzero(close)):
+                pairs.append((gallery.ids[rows[i]], gallery.ids[columns[j]], float(np.sqrt(max(sq[i, j], 0.0)))))
+
+    pairs.sort(key=lambda pair: pair[2])
+    return pairs
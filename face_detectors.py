@@ -0,0 +1,56 @@
+import functools
+import os
+import cv2
+
+FRONTAL_FACE_CASCADE = 'haarcascade_frontalface_default.xml'
+# LBP cascades trade a little accuracy for much faster detection; pip builds
+# of OpenCV do not ship them, so they are also looked up in COGNIFACE_CASCADE_DIR
+# and the usual system locations
+LBP_FRONTAL_FACE_CASCADE = 'lbpcascade_frontalface_improved.xml'
+
+DETECTOR_CASCADES = {
+    'haar': FRONTAL_FACE_CASCADE,
+    'lbp': LBP_FRONTAL_FACE_CASCADE,
+}
+
+CASCADE_DIRS = [
+    os.environ.get('COGNIFACE_CASCADE_DIR', ''),
+    cv2.data.haarcascades,
+    '/usr/share/opencv4/lbpcascades',
+    '/usr/share/opencv/lbpcascades',
+    '/usr/local/share/opencv4/lbpcascades',
+]
+
+
+def find_cascade(filename):
+    """Return the path of a cascade file, or None if it is not installed"""
+    for directory in CASCADE_DIRS:
+        if directory:
+            path = os.path.join(directory, filename)
+            if os.path.exists(path):
+                return path
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def load_cascade(filename=FRONTAL_FACE_CASCADE):
+    """Load an OpenCV cascade once per process and share it between systems"""
+    path = find_cascade(filename)
+    cascade = cv2.CascadeClassifier(path) if path else None
+    if cascade is None or cascade.empty():
+        raise IOError(f"Could not load cascade classifier: {filename}")
+    print(f"✅ Loaded cascade classifier: {filename}")
+    return cascade
+
+
+def load_detector(detector='haar'):
+    """Load the cascade for a detector name ('haar' or 'lbp'), falling back to Haar"""
+    if detector not in DETECTOR_CASCADES:
+        raise ValueError(f"Unknown face detector: {detector}")
+    try:
+        return load_cascade(DETECTOR_CASCADES[detector])
+    except IOError:
+        if detector == 'haar':
+            raise
+        print(f"⚠️  {DETECTOR_CASCADES[detector]} not found, falling back to the Haar cascade")
+        return load_cascade(FRONTAL_FACE_CASCADE)
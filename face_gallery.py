@@ -0,0 +1,229 @@
+import json
+import threading
+import numpy as np
+
+
+class FaceGallery:
+    """In-memory gallery of known face encodings for one college.
+
+    Encodings live in a single (capacity x D) float32 matrix so that a new,
+    re-encoded or removed student only touches one row instead of rebuilding
+    the whole gallery. Derived indexes (PCA, ANN, ...) are tagged with the
+    gallery version and rebuilt lazily the next time they are requested.
+    """
+
+    def __init__(self, normalize=True, initial_capacity=64):
+        self.normalize = normalize
+        self.initial_capacity = initial_capacity
+        self.version = 0
+        # Per-college calibration (see calibration.py); None means the system default
+        self.threshold = None
+        self.margin = 0.0
+        self._lock = threading.RLock()
+        self._derived = {}
+        self.clear()
+
+    def clear(self):
+        """Drop every encoding from the gallery"""
+        with self._lock:
+            self.matrix = None
+            self.sq_norms = None
+            self.size = 0
+            self.ids = []
+            self.names = []
+            self.index = {}
+            self._touch()
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, student_id):
+        return student_id in self.index
+
+    @property
+    def dim(self):
+        return None if self.matrix is None else self.matrix.shape[1]
+
+    @property
+    def encodings(self):
+        """View of the live (size x D) part of the gallery matrix"""
+        if self.matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self.matrix[:self.size]
+
+    def parse_encoding(self, encoding):
+        """Turn a stored JSON encoding (or any array-like) into a gallery row"""
+        if isinstance(encoding, str):
+            encoding = json.loads(encoding)
+        vector = np.asarray(encoding, dtype=np.float32).ravel()
+        if vector.size == 0:
+            raise ValueError("empty face encoding")
+        if self.normalize:
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector = vector / norm
+        return vector
+
+    def add(self, student_id, name, encoding):
+        """Add a student, or replace its row if it is already in the gallery"""
+        vector = self.parse_encoding(encoding)
+        with self._lock:
+            row = self.index.get(student_id)
+            if row is not None:
+                self._write_row(row, vector)
+                self.names[row] = name
+            else:
+                self._ensure_capacity(vector.size, self.size + 1)
+                row = self.size
+                self._write_row(row, vector)
+                self.ids.append(student_id)
+                self.names.append(name)
+                self.index[student_id] = row
+                self.size += 1
+            self._touch()
+        return row
+
+    def update(self, student_id, name, encoding):
+        """Replace the encoding of a student (adds it when missing)"""
+        return self.add(student_id, name, encoding)
+
+    def remove(self, student_id):
+        """Remove a student by moving the last row into its slot"""
+        with self._lock:
+            row = self.index.pop(student_id, None)
+            if row is None:
+                return False
+            last = self.size - 1
+            if row != last:
+                self.matrix[row] = self.matrix[last]
+                self.sq_norms[row] = self.sq_norms[last]
+                self.ids[row] = self.ids[last]
+                self.names[row] = self.names[last]
+                self.index[self.ids[row]] = row
+            self.ids.pop()
+            self.names.pop()
+            self.size = last
+            self._touch()
+        return True
+
+    def rebuild(self, entries):
+        """Replace the gallery with (student_id, name, encoding) entries.
+
+        Returns the list of (student_id, error) pairs that could not be loaded.
+        """
+        failures = []
+        with self._lock:
+            self.clear()
+            for student_id, name, encoding in entries:
+                try:
+                    self.add(student_id, name, encoding)
+                except (ValueError, TypeError) as e:
+                    failures.append((student_id, e))
+        return failures
+
+    def nearest(self, queries):
+        """Vectorized nearest-neighbour search over the gallery.
+
+        Takes a (k x D) matrix (or a single D vector) and returns
+        (rows, distances) with the best gallery row and Euclidean distance for
+        each query. Rows are -1 when the gallery is empty.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            if self.size == 0:
+                return (np.full(len(queries), -1, dtype=np.int64),
+                        np.full(len(queries), np.inf, dtype=np.float32))
+            distances = self.distances(queries)
+            rows = np.argmin(distances, axis=1)
+            return rows, distances[np.arange(len(queries)), rows]
+
+    def topk(self, queries, k):
+        """Return (rows, distances) of the k closest gallery rows for each query, nearest first.
+
+        Both arrays are (queries x min(k, size)); a gallery that is empty gives
+        a single column of -1 rows with infinite distance.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            if self.size == 0:
+                return (np.full((len(queries), 1), -1, dtype=np.int64),
+                        np.full((len(queries), 1), np.inf, dtype=np.float32))
+            distances = self.distances(queries)
+        k = min(k, distances.shape[1])
+        if k < distances.shape[1]:
+            rows = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            rows = np.tile(np.arange(k), (len(queries), 1))
+        top = np.take_along_axis(distances, rows, axis=1)
+        order = np.argsort(top, axis=1)
+        return np.take_along_axis(rows, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def match(self, query, threshold):
+        """Best row for one encoding and whether it is accepted.
+
+        A match is accepted when it is closer than the threshold and beats the
+        runner-up by at least the gallery margin. Returns (row, distance,
+        runner_up, accepted); row is -1 for an empty gallery.
+        """
+        rows, distances = self.topk(query, 2)
+        row, distance = int(rows[0, 0]), float(distances[0, 0])
+        if row == -1:
+            return -1, float('inf'), float('inf'), False
+        runner_up = float(distances[0, 1]) if rows.shape[1] > 1 else float('inf')
+        return row, distance, runner_up, distance < threshold and runner_up - distance >= self.margin
+
+    def distance_to(self, row, query):
+        """Euclidean distance between one encoding and one gallery row"""
+        query = np.asarray(query, dtype=np.float32).ravel()
+        with self._lock:
+            if row >= self.size:
+                return float('inf')
+            difference = self.matrix[row] - query
+        return float(np.sqrt(np.dot(difference, difference)))
+
+    def distances(self, queries):
+        """Euclidean distances between queries and every gallery row (k x N)"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            gallery = self.encodings
+            if queries.shape[1] != gallery.shape[1]:
+                raise ValueError(f"encoding has {queries.shape[1]} values, gallery expects {gallery.shape[1]}")
+            sq = np.einsum('ij,ij->i', queries, queries)[:, None] + self.sq_norms[:self.size][None, :]
+            sq -= 2.0 * (queries @ gallery.T)
+        np.maximum(sq, 0, out=sq)
+        return np.sqrt(sq, out=sq)
+
+    def derived(self, name, builder):
+        """Return a derived index, rebuilding it only if the gallery changed"""
+        with self._lock:
+            cached = self._derived.get(name)
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+            value = builder(self)
+            self._derived[name] = (self.version, value)
+            return value
+
+    def _touch(self):
+        self.version += 1
+
+    def _ensure_capacity(self, dim, needed):
+        if self.matrix is None:
+            capacity = max(self.initial_capacity, needed)
+            self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+            self.sq_norms = np.zeros(capacity, dtype=np.float32)
+            return
+        if dim != self.dim:
+            raise ValueError(f"encoding has {dim} values, gallery expects {self.dim}")
+        if needed > len(self.matrix):
+            capacity = max(needed, 2 * len(self.matrix))
+            matrix = np.zeros((capacity, dim), dtype=np.float32)
+            matrix[:self.size] = self.matrix[:self.size]
+            sq_norms = np.zeros(capacity, dtype=np.float32)
+            sq_norms[:self.size] = self.sq_norms[:self.size]
+            self.matrix, self.sq_norms = matrix, sq_norms
+
+    def _write_row(self, row, vector):
+        if vector.size != self.dim:
+            raise ValueError(f"encoding has {vector.size} values, gallery expects {self.dim}")
+        self.matrix[row] = vector
+        self.sq_norms[row] = float(np.dot(vector, vector))
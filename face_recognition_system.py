@@ -1,56 +1,39 @@
 import cv2
 import numpy as np
-import os
 import json
-import base64
 
-class FaceRecognitionSystem:
-    def __init__(self):
-        self.known_face_encodings = []
-        self.known_face_names = []
-        # Load OpenCV face detector
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    
-    def load_known_faces(self, students):
-        """Load face encodings from student database"""
-        self.known_face_encodings = []
-        self.known_face_names = []
-        
-        print(f"🔍 Loading face encodings for {len(students)} students...")
-        
-        for student in students:
-            if student.face_encoding:
-                try:
-                    encoding = json.loads(student.face_encoding)
-                    self.known_face_encodings.append(np.array(encoding))
-                    self.known_face_names.append(student.student_id)
-                    print(f"✅ Loaded encoding for {student.name} ({student.student_id})")
-                except Exception as e:
-                    print(f"❌ Error loading encoding for {student.name}: {e}")
-                    continue
-            else:
-                print(f"❌ No face encoding for {student.name}")
-        
-        print(f"✅ Successfully loaded {len(self.known_face_encodings)} face encodings")
+from batch_preprocessing import BatchPreprocessor
+from recognition_base import GalleryRecognitionSystem
 
-    def encode_face(self, image_path):
-        """Encode face from image file"""
+class FaceRecognitionSystem(GalleryRecognitionSystem):
+    """Recognition on raw grayscale 100x100 crops scaled to [0,1]"""
+    
+    normalize = False
+    # Default for unnormalized encodings; calibrated galleries override it
+    recognition_threshold = 0.6  # Adjust this threshold as needed
+    
+    def make_preprocessor(self):
+        return BatchPreprocessor(equalize=False, blur=False, unit_normalize=False)
+    
+    def detect_faces(self, frame):
+        # Resize frame for faster processing
+        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
+        gray = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
+        faces = self.face_cascade.detectMultiScale(
+            gray, 
+            scaleFactor=1.1, 
+            minNeighbors=5, 
+            minSize=(30, 30)
+        )
+        return gray, [tuple(int(v) for v in face) for face in faces]
+    
+    def face_location(self, x, y, w, h):
+        # Convert coordinates back to original scale (0.25 resize in detect_faces)
+        return (y*4, (x+w)*4, (y+h)*4, x*4)
+    
+    def encode_and_locate_face(self, image):
+        """Encode face from a decoded BGR image, returning (encoding, (x, y, w, h)) or (None, None)"""
         try:
-            print(f"🔍 Encoding face from: {image_path}")
-            
-            # Check if file exists
-            if not os.path.exists(image_path):
-                print("❌ Image file does not exist")
-                return None
-                
-            # Read image
-            image = cv2.imread(image_path)
-            if image is None:
-                print("❌ Could not read image file - file may be corrupted or wrong format")
-                return None
-                
-            print(f"✅ Image loaded successfully. Shape: {image.shape}")
-            
             # Convert to grayscale
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
             print(f"✅ Converted to grayscale. Shape: {gray.shape}")
@@ -91,7 +74,7 @@ class FaceRecognitionSystem:
                 encoding = face_roi.flatten().tolist()
                 print(f"✅ Face encoded successfully. Encoding length: {len(encoding)}")
                 
-                return json.dumps(encoding)
+                return json.dumps(encoding), (int(x), int(y), int(w), int(h))
             else:
                 print("❌ No faces detected in image. Trying alternative detection parameters...")
                 
@@ -112,81 +95,13 @@ class FaceRecognitionSystem:
                     face_roi = face_roi.astype(np.float32) / 255.0
                     encoding = face_roi.flatten().tolist()
                     print(f"✅ Face encoded with alternative parameters")
-                    return json.dumps(encoding)
+                    return json.dumps(encoding), (int(x), int(y), int(w), int(h))
                 else:
                     print("❌ No faces detected even with alternative parameters")
-                    return None
+                    return None, None
                     
         except Exception as e:
             print(f"❌ Error encoding face: {str(e)}")
             import traceback
             traceback.print_exc()
-            return None
-
-def recognize_face(self, frame):
-    """Recognize face from camera frame"""
-    try:
-        # Resize frame for faster processing (optional)
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
-        
-        # Detect faces
-        faces = self.face_cascade.detectMultiScale(
-            gray, 
-            scaleFactor=1.1, 
-            minNeighbors=5, 
-            minSize=(30, 30)
-        )
-        
-        print(f"🔍 Detected {len(faces)} face(s) in frame")
-        
-        face_names = []
-        face_locations = []
-        
-        for (x, y, w, h) in faces:
-            # Extract face region
-            face_roi = gray[y:y+h, x:x+w]
-            face_roi = cv2.resize(face_roi, (100, 100))
-            face_roi = face_roi.astype(np.float32) / 255.0
-            current_encoding = face_roi.flatten()
-            
-            name = "Unknown"
-            min_distance = float('inf')
-            best_match_index = -1
-            
-            # Compare with known faces
-            for i, known_encoding in enumerate(self.known_face_encodings):
-                try:
-                    # Calculate Euclidean distance
-                    distance = np.linalg.norm(current_encoding - known_encoding)
-                    
-                    # Lower distance = better match
-                    if distance < min_distance:
-                        min_distance = distance
-                        best_match_index = i
-                except Exception as e:
-                    print(f"❌ Error comparing with known face {i}: {e}")
-                    continue
-            
-            # Set threshold for recognition
-            recognition_threshold = 0.6  # Adjust this threshold as needed
-            if best_match_index != -1 and min_distance < recognition_threshold:
-                name = self.known_face_names[best_match_index]
-                print(f"✅ Recognized: {name} (distance: {min_distance:.4f})")
-            else:
-                if best_match_index != -1:
-                    print(f"❌ Face not recognized (best distance: {min_distance:.4f}, threshold: {recognition_threshold})")
-                else:
-                    print(f"❌ No known faces to compare with")
-            
-            face_names.append(name)
-            # Convert coordinates back to original scale and format
-            face_locations.append((y*4, (x+w)*4, (y+h)*4, x*4))  # Multiply by 4 if using 0.25 scale
-        
-        return face_names, face_locations
-        
-    except Exception as e:
-        print(f"❌ Error in face recognition: {e}")
-        return [], []
\ No newline at end of file
+            return None, None
@@ -0,0 +1,14 @@
+"""Gunicorn settings for CogniFace (picked up from the working directory).
+
+With COGNIFACE_WARMUP=1 every worker initializes recognition and loads the
+college galleries right after it is forked, before it takes traffic:
+
+    COGNIFACE_WARMUP=1 gunicorn --workers 4 app:app
+"""
+import os
+
+
+def post_fork(server, worker):
+    if os.environ.get('COGNIFACE_WARMUP'):
+        from app import warm_up_recognition
+        warm_up_recognition()
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+import cv2
+import numpy as np
+
+# Longest side of the stored master image; originals above it are downscaled
+MAX_MASTER_SIDE = 1024
+READ_CHUNK_SIZE = 64 * 1024
+JPEG_QUALITY = 92
+SHA256_HEX = re.compile(r'[0-9a-f]{64}')
+
+
+class IngestError(ValueError):
+    """An upload could not be read or decoded"""
+
+
+def read_upload(stream, max_bytes=None, chunk_size=READ_CHUNK_SIZE):
+    """Read an upload stream chunk by chunk, hashing it on the way.
+
+    Returns (data, sha256 hex digest).
+    """
+    hasher = hashlib.sha256()
+    data = bytearray()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        hasher.update(chunk)
+        data += chunk
+        if max_bytes and len(data) > max_bytes:
+            raise IngestError(f"upload is larger than {max_bytes} bytes")
+    if not data:
+        raise IngestError("upload is empty")
+    return data, hasher.hexdigest()
+
+
+def bounded_master(image, max_side=MAX_MASTER_SIDE):
+    """Downscale an image so its longest side is at most max_side"""
+    height, width = image.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def content_path(upload_folder, kind, digest):
+    """Path of a stored file, sharded by the first two hex digits of its hash"""
+    return os.path.join(upload_folder, kind, digest[:2], f"{digest}.jpg")
+
+
+def store_jpeg(path, image):
+    """Write a JPEG unless content with the same hash is already stored"""
+    if os.path.exists(path):
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        raise IngestError("could not encode image")
+    # Write to a unique temporary file first so a concurrent reader never sees half a
+    # file and two writers of the same photo (even threads of one process) never share one
+    fd, temporary_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(encoded.tobytes())
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    return True
+
+
+def ingest_upload(stream, upload_folder, face_system, max_bytes=None, max_side=MAX_MASTER_SIDE):
+    """Turn an uploaded photo into a stored master and a face encoding.
+
+    The upload is read once, hashed while streaming and decoded once. The
+    bounded-resolution master is stored by content hash, so uploading the same
+    photo twice stores it once. The encoding is computed from the decoded
+    master directly instead of re-reading it from disk.
+    """
+    data, digest = read_upload(stream, max_bytes)
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    del data
+    if image is None:
+        raise IngestError("could not decode image")
+
+    master = bounded_master(image, max_side)
+    del image
+
+    photo_path = content_path(upload_folder, 'masters', digest)
+    stored = store_jpeg(photo_path, master)
+    if stored:
+        print(f"✅ Stored master {master.shape[1]}x{master.shape[0]} at: {photo_path}")
+    else:
+        # Refresh the age prune_uploads goes by
+        os.utime(photo_path)
+        print(f"♻️  Photo already stored at: {photo_path}")
+
+    try:
+        face_encoding = face_system.encode_face_image(master)
+    except BaseException:
+        # Nothing will reference a master whose upload failed
+        if stored:
+            os.remove(photo_path)
+        raise
+
+    return {
+        'content_hash': digest,
+        'photo_path': photo_path,
+        'face_encoding': face_encoding,
+    }
+
+
+def reuse_upload(content_hash, upload_folder, face_system):
+    """Encode a master stored by an earlier upload, so a resubmitted form needs no new upload"""
+    if not SHA256_HEX.fullmatch(content_hash or ''):
+        raise IngestError("invalid content hash")
+    photo_path = content_path(upload_folder, 'masters', content_hash)
+    master = cv2.imread(photo_path)
+    if master is None:
+        raise IngestError("the earlier upload is no longer stored; please choose the photo again")
+    return {
+        'content_hash': content_hash,
+        'photo_path': photo_path,
+        'face_encoding': face_system.encode_face_image(master),
+    }
+
+
+def prune_uploads(upload_folder, referenced_paths, min_age=24 * 3600):
+    """Delete stored masters (and face crops of older versions) that no student references.
+
+    Uploads rejected as duplicates stay stored so the form can be resubmitted
+    without choosing the photo again; files younger than min_age seconds are
+    kept for that. Returns the removed paths.
+    """
+    referenced = {os.path.normpath(path) for path in referenced_paths if path}
+    cutoff = time.time() - min_age
+    removed = []
+    for kind in ('masters', 'faces'):
+        for directory, _, filenames in os.walk(os.path.join(upload_folder, kind)):
+            for filename in filenames:
+                path = os.path.normpath(os.path.join(directory, filename))
+                if path in referenced or os.path.getmtime(path) > cutoff:
+                    continue
+                os.remove(path)
+                removed.append(path)
+    return removed
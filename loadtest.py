@@ -0,0 +1,287 @@
+"""Load test the Flask app with a simulated fleet of live attendance kiosks.
+
+Starts the app against a freshly seeded SQLite database, logs N kiosks in as
+several college admins and has each kiosk post synthetic JPEG frames to
+/recognize-face (plus a share of manual /mark-attendance writes) at a fixed
+rate. Reports latency percentiles, error rates and SQLite lock errors for the
+development server and for a multi-worker WSGI server (gunicorn):
+
+    python loadtest.py --kiosks 20 --rate 2 --duration 30
+    python loadtest.py --servers wsgi --workers 8
+"""
+import argparse
+import base64
+import http.cookiejar
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+ADMIN_PASSWORD = 'loadtest123'
+
+SEED_SCRIPT = """
+import json, random, sys
+import app as cogniface
+from database import db, College, Admin, Student
+
+colleges, students_per_college = int(sys.argv[1]), int(sys.argv[2])
+rng = random.Random(0)
+with cogniface.app.app_context():
+    db.create_all()
+    for c in range(colleges):
+        college = College(name=f"Load Test College {c}", code=f"LT{c}")
+        db.session.add(college)
+        db.session.flush()
+        admin = Admin(username=f"loadtest_admin{c}", college_id=college.id)
+        admin.set_password(sys.argv[3])
+        db.session.add(admin)
+        for s in range(students_per_college):
+            encoding = json.dumps([round(rng.random(), 3) for _ in range(10000)])
+            db.session.add(Student(college_id=college.id, student_id=f"LT{c}-{s:05d}",
+                                   name=f"Student {c}-{s}", face_encoding=encoding))
+    db.session.commit()
+"""
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def make_frames(count=8, size=(640, 480)):
+    """Synthetic JPEG frames as data URLs, like the ones live_attendance.html posts"""
+    import cv2
+    import numpy as np
+    rng = np.random.default_rng(0)
+    width, height = size
+    frames = []
+    for _ in range(count):
+        frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        center = (int(rng.integers(200, 440)), int(rng.integers(150, 330)))
+        cv2.ellipse(frame, center, (80, 100), 0, 0, 360, (180, 190, 220), -1)
+        ok, data = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        frames.append('data:image/jpeg;base64,' + base64.b64encode(data.tobytes()).decode('ascii'))
+    return frames
+
+
+def server_command(kind, port, workers):
+    if kind == 'dev':
+        return [sys.executable, '-c',
+                f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    return [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', '4',
+            '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app']
+
+
+def wait_until_up(url, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return
+        except urllib.error.HTTPError:
+            return  # Any HTTP answer means the server is up
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start in time")
+
+
+class Kiosk(threading.Thread):
+    """One live attendance kiosk: logs in, then posts frames at a fixed rate"""
+
+    def __init__(self, base_url, username, frames, student_ids, rate, duration, mark_ratio, results):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.username = username
+        self.frames = frames
+        self.student_ids = student_ids
+        self.interval = 1.0 / rate
+        self.duration = duration
+        self.mark_ratio = mark_ratio
+        self.results = results
+        self.rng = random.Random(username + str(id(self)))
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+
+    def login(self):
+        data = urllib.parse.urlencode({'username': self.username, 'password': ADMIN_PASSWORD}).encode()
+        try:
+            self.opener.open(self.base_url + '/login', data, timeout=30)
+        except urllib.error.HTTPError as e:
+            if e.code != 302 or not e.headers.get('Location', '').endswith('/dashboard'):
+                raise RuntimeError(f"login failed for {self.username}: HTTP {e.code}")
+
+    def run(self):
+        next_send = time.perf_counter() + self.rng.random() * self.interval
+        stop = time.perf_counter() + self.duration
+        while next_send < stop:
+            time.sleep(max(0.0, next_send - time.perf_counter()))
+            if self.rng.random() < self.mark_ratio:
+                self.request('mark-attendance', '/mark-attendance',
+                             urllib.parse.urlencode({'student_id': self.rng.choice(self.student_ids)}).encode(),
+                             'application/x-www-form-urlencoded')
+            else:
+                body = json.dumps({'image': self.rng.choice(self.frames), 'auto_capture': True}).encode()
+                self.request('recognize-face', '/recognize-face', body, 'application/json')
+            next_send += self.interval
+
+    def request(self, endpoint, path, body, content_type):
+        request = urllib.request.Request(self.base_url + path, body, {'Content-Type': content_type})
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                text = response.read().decode('utf-8', 'replace')
+            status = response.status
+        except urllib.error.HTTPError as e:
+            text = e.read().decode('utf-8', 'replace')
+            status = e.code
+        except OSError as e:
+            text, status = str(e), None
+        latency = time.perf_counter() - start
+
+        error = status != 200
+        if not error:
+            try:
+                payload = json.loads(text)
+                # An unrecognized face is a normal answer for synthetic frames
+                error = not payload.get('success') and payload.get('error') not in ('Face not recognized', 'Student not found')
+            except ValueError:
+                error = True
+        self.results.append((endpoint, latency, error, 'database is locked' in text))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(kind, results, duration):
+    print(f"\n📊 {kind} server")
+    print(f"  {'endpoint':<16}{'requests':>9}{'req/s':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}{'locked':>8}")
+    summary = {}
+    for endpoint in sorted({r[0] for r in results}):
+        rows = [r for r in results if r[0] == endpoint]
+        latencies = [r[1] * 1000 for r in rows]
+        errors = sum(r[2] for r in rows)
+        locked = sum(r[3] for r in rows)
+        summary[endpoint] = {
+            'requests': len(rows),
+            'p50_ms': percentile(latencies, 0.5),
+            'p90_ms': percentile(latencies, 0.9),
+            'p99_ms': percentile(latencies, 0.99),
+            'error_rate': errors / len(rows),
+            'lock_errors': locked,
+        }
+        print(f"  {endpoint:<16}{len(rows):>9}{len(rows) / duration:>8.1f}"
+              f"{summary[endpoint]['p50_ms']:>9.1f}{summary[endpoint]['p90_ms']:>9.1f}"
+              f"{summary[endpoint]['p99_ms']:>9.1f}{max(latencies):>9.1f}"
+              f"{errors / len(rows):>8.1%}{locked:>8}")
+    return summary
+
+
+def run_server_test(kind, args, workdir, env, frames, template_db):
+    # Every server starts from a copy of the seeded database, so check-ins and
+    # grown tables from an earlier run do not skew this one
+    database = os.path.join(workdir, f'{kind}.db')
+    shutil.copyfile(template_db, database)
+    env = dict(env, DATABASE_URL=f"sqlite:///{database}")
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    log_path = os.path.join(workdir, f'{kind}-server.log')
+    log = open(log_path, 'w')
+    process = subprocess.Popen(server_command(kind, port, args.workers), cwd=workdir, env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    try:
+        wait_until_up(base_url + '/', process)
+        results = []
+        kiosks = []
+        for k in range(args.kiosks):
+            college = k % args.colleges
+            student_ids = [f"LT{college}-{s:05d}" for s in range(args.students)]
+            kiosks.append(Kiosk(base_url, f"loadtest_admin{college}", frames, student_ids,
+                                args.rate, args.duration, args.mark_ratio, results))
+        # Log everyone in first so sessions are not part of the measured load
+        for kiosk in kiosks:
+            kiosk.login()
+        for kiosk in kiosks:
+            kiosk.start()
+        for kiosk in kiosks:
+            kiosk.join()
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        log.close()
+
+    summary = summarize(kind, results, args.duration)
+    # Error pages hide the exception, so lock contention is also counted from the server log
+    with open(log_path, errors='replace') as f:
+        summary['logged_lock_errors'] = sum(line.count('database is locked') for line in f)
+    print(f"  'database is locked' in server log: {summary['logged_lock_errors']}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test CogniFace with simulated kiosks')
+    parser.add_argument('--kiosks', type=int, default=10)
+    parser.add_argument('--rate', type=float, default=1.0, help='Frames per second per kiosk')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds of load per server')
+    parser.add_argument('--colleges', type=int, default=2)
+    parser.add_argument('--students', type=int, default=100, help='Seeded students per college')
+    parser.add_argument('--mark-ratio', type=float, default=0.2, help='Share of requests that are manual check-ins')
+    parser.add_argument('--servers', nargs='+', choices=['dev', 'wsgi'], default=['dev', 'wsgi'])
+    parser.add_argument('--workers', type=int, default=4, help='WSGI worker processes')
+    parser.add_argument('--output', default='loadtest_results.json', help='Where to write the JSON summary')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary directory and server logs')
+    args = parser.parse_args()
+
+    if 'wsgi' in args.servers:
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            print("⚠️  gunicorn is not installed; skipping the WSGI server (pip install gunicorn)")
+            args.servers = [kind for kind in args.servers if kind != 'wsgi']
+
+    workdir = tempfile.mkdtemp(prefix='cogniface-loadtest-')
+    template_db = os.path.join(workdir, 'template.db')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')])))
+    try:
+        print(f"🔧 Seeding {args.colleges} college(s) x {args.students} student(s) in {workdir}")
+        subprocess.run([sys.executable, '-c', SEED_SCRIPT, str(args.colleges), str(args.students), ADMIN_PASSWORD],
+                       cwd=workdir, env=dict(env, DATABASE_URL=f"sqlite:///{template_db}"),
+                       check=True, stdout=subprocess.DEVNULL)
+        frames = make_frames()
+
+        summaries = {}
+        for kind in args.servers:
+            print(f"🚀 {args.kiosks} kiosk(s) at {args.rate}/s for {args.duration:.0f}s against the {kind} server")
+            summaries[kind] = run_server_test(kind, args, workdir, env, frames, template_db)
+
+        with open(args.output, 'w') as f:
+            json.dump(summaries, f, indent=2)
+        print(f"\n📝 Results written to {args.output}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+import os
+import threading
+import cv2
+import numpy as np
+
+from face_detectors import load_detector
+from face_gallery import FaceGallery
+from recognition_cache import RecognitionCache, cached_match, dhash
+
+
+class GalleryRecognitionSystem:
+    """Gallery, cache and calibration handling shared by the recognition systems.
+
+    Subclasses only decide how faces are detected (detect_faces), how a crop
+    becomes an encoding (make_preprocessor, encode_and_locate_face) and how a
+    detected box maps back to frame coordinates (face_location).
+    """
+
+    # Whether gallery encodings are scaled to unit length
+    normalize = False
+    # Default for uncalibrated galleries
+    recognition_threshold = 0.6
+
+    def __init__(self, detector='haar', cache_size=256):
+        # One gallery per college, patched in place as students change
+        self.galleries = {}
+        self.active_college_id = None
+        # Shared OpenCV face detector (loaded once per process)
+        self.face_cascade = load_detector(detector)
+        # Batched preprocessing buffers, one set per thread
+        self._local = threading.local()
+        # Per-college cache of recent match results keyed by crop hash (0 disables it)
+        self.cache_size = cache_size
+        self.caches = {}
+        # Calibrated (threshold, margin) per college, kept even before its gallery is loaded
+        self.calibrations = {}
+
+    def make_preprocessor(self):
+        raise NotImplementedError
+
+    def detect_faces(self, frame):
+        """Return (gray, [(x, y, w, h), ...]) for a frame"""
+        raise NotImplementedError
+
+    def face_location(self, x, y, w, h):
+        """(top, right, bottom, left) of a detected box in frame coordinates"""
+        return (y, x+w, y+h, x)
+
+    def encode_and_locate_face(self, image):
+        raise NotImplementedError
+
+    def get_gallery(self, college_id=None):
+        """Return the gallery for a college, or an empty one that is not registered if it is not loaded"""
+        if college_id is None:
+            college_id = self.active_college_id
+        gallery = self.galleries.get(college_id)
+        if gallery is None:
+            gallery = FaceGallery(normalize=self.normalize)
+        return gallery
+
+    def has_gallery(self, college_id):
+        return college_id in self.galleries
+
+    def get_cache(self, college_id):
+        cache = self.caches.get(college_id)
+        if cache is None and self.cache_size:
+            cache = self.caches[college_id] = RecognitionCache(self.cache_size)
+        return cache
+
+    def cache_stats(self, college_id=None):
+        """Hit rates of the recognition caches, for one college or all of them"""
+        if college_id is not None:
+            cache = self.caches.get(college_id)
+            return cache.stats() if cache else None
+        return {college_id: cache.stats() for college_id, cache in self.caches.items()}
+
+    def preprocessor(self):
+        """This thread's batch preprocessor"""
+        preprocessor = getattr(self._local, 'preprocessor', None)
+        if preprocessor is None:
+            preprocessor = self._local.preprocessor = self.make_preprocessor()
+        return preprocessor
+
+    def threshold_for(self, gallery):
+        return gallery.threshold if gallery.threshold is not None else self.recognition_threshold
+
+    def find_duplicates(self, encoding, college_id=None, k=5, threshold=None):
+        """Enrolled students whose face is within threshold of an encoding, nearest first"""
+        gallery = self.galleries.get(self.active_college_id if college_id is None else college_id)
+        if gallery is None:
+            return []
+        if threshold is None:
+            threshold = self.threshold_for(gallery)
+        rows, distances = gallery.topk(gallery.parse_encoding(encoding), k)
+        return [
+            {'student_id': gallery.ids[row], 'name': gallery.names[row], 'distance': float(distance)}
+            for row, distance in zip(rows[0], distances[0])
+            if row != -1 and distance < threshold
+        ]
+
+    def set_calibration(self, college_id, threshold, margin=0.0):
+        """Use a calibrated threshold and margin for a college gallery, now or once it is loaded"""
+        self.calibrations[college_id] = (threshold, margin or 0.0)
+        gallery = self.galleries.get(college_id)
+        if gallery is not None:
+            gallery.threshold, gallery.margin = self.calibrations[college_id]
+
+    def load_known_faces(self, students, college_id=None):
+        """Load face encodings from student database"""
+        if college_id is None and students:
+            college_id = students[0].college_id
+        self.active_college_id = college_id
+        # Build a new gallery and publish it only once it is complete and calibrated,
+        # so concurrent recognition never sees a half-loaded one
+        gallery = FaceGallery(normalize=self.normalize)
+
+        print(f"🔍 Loading face encodings for {len(students)} students...")
+
+        failures = gallery.rebuild(
+            (student.student_id, student.name, student.face_encoding)
+            for student in students if student.face_encoding
+        )
+        for student_id, e in failures:
+            print(f"❌ Error loading encoding for {student_id}: {e}")
+        gallery.threshold, gallery.margin = self.calibrations.get(college_id, (None, 0.0))
+        self.galleries[college_id] = gallery
+        self.caches.pop(college_id, None)
+
+        print(f"✅ Successfully loaded {len(gallery)}/{len(students)} face encodings")
+
+    def add_student(self, student):
+        """Add or refresh a single student in its college gallery"""
+        gallery = self.galleries.get(student.college_id)
+        if gallery is None:
+            # Not loaded yet; the full load will pick the student up
+            return False
+        if not student.face_encoding:
+            gallery.remove(student.student_id)
+            return False
+        try:
+            gallery.add(student.student_id, student.name, student.face_encoding)
+            return True
+        except (ValueError, TypeError) as e:
+            print(f"❌ Error loading encoding for {student.name}: {e}")
+            return False
+
+    def update_student(self, student):
+        """Replace the gallery row of a re-encoded student"""
+        return self.add_student(student)
+
+    def remove_student(self, student):
+        """Drop a student from its college gallery"""
+        gallery = self.galleries.get(student.college_id)
+        return gallery is not None and gallery.remove(student.student_id)
+
+    def encode_face(self, image_path):
+        """Encode the largest face of an image file"""
+        try:
+            print(f"🔍 Encoding face from: {image_path}")
+
+            if not os.path.exists(image_path):
+                print("❌ Image file does not exist")
+                return None
+
+            image = cv2.imread(image_path)
+            if image is None:
+                print("❌ Could not read image file - file may be corrupted or wrong format")
+                return None
+
+            print(f"✅ Image loaded successfully. Shape: {image.shape}")
+            return self.encode_face_image(image)
+
+        except Exception as e:
+            print(f"❌ Error encoding face: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    def encode_face_data(self, data):
+        """Encode the largest face of encoded image bytes (JPEG, PNG, ...)"""
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            print("❌ Could not decode image data")
+            return None
+        return self.encode_face_image(image)
+
+    def encode_face_image(self, image):
+        """Encode the largest face of a decoded BGR image"""
+        encoding, _ = self.encode_and_locate_face(image)
+        return encoding
+
+    def recognize_face_data(self, data, college_id=None):
+        """Recognize faces in encoded image bytes (JPEG, PNG, ...)"""
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError('Could not decode image')
+        return self.recognize_face(frame, college_id)
+
+    def recognize_face(self, frame, college_id=None):
+        """Recognize faces in one camera frame"""
+        results = self.recognize_faces([frame], college_id)
+        return results[0] if results else ([], [])
+
+    def recognize_faces(self, frames, college_id=None):
+        """Recognize faces in a micro-batch of frames, returning (face_names, face_locations) per frame"""
+        try:
+            if college_id is None:
+                college_id = self.active_college_id
+            gallery = self.get_gallery(college_id)
+
+            detections = []
+            for frame in frames:
+                gray, faces = self.detect_faces(frame)
+                print(f"🔍 Detected {len(faces)} face(s) in frame")
+                detections.append((gray, faces))
+
+            # Preprocess every face of the batch into one encoding buffer
+            encodings, crops = self.preprocessor().process_batch(detections)
+            threshold = self.threshold_for(gallery)
+
+            # Cached results are only valid for this gallery content and calibration
+            cache = self.get_cache(college_id)
+            version = (gallery.version, threshold, gallery.margin)
+
+            results = []
+            row = 0
+            for gray, faces in detections:
+                face_names = []
+                face_locations = []
+                for (x, y, w, h) in faces:
+                    crop_hash = dhash(crops[row]) if cache else None
+                    face_names.append(self.match_face(gallery, threshold, encodings[row], cache, crop_hash, version))
+                    face_locations.append(self.face_location(x, y, w, h))
+                    row += 1
+                results.append((face_names, face_locations))
+            return results
+
+        except Exception as e:
+            print(f"❌ Error in face recognition: {e}")
+            import traceback
+            traceback.print_exc()
+            return [([], []) for _ in frames]
+
+    def match_face(self, gallery, threshold, encoding, cache=None, crop_hash=None, version=None):
+        """Student id of one face encoding, or "Unknown" """
+        # Near-identical crops skip the full match once the cached student is
+        # verified against the current crop
+        cached = cache.get(crop_hash, version) if cache else None
+        if cached is not None:
+            verified = cached_match(gallery, cached, encoding, threshold)
+            if verified is not None:
+                name, distance = verified
+                print(f"⚡ Cached: {name} (distance: {distance:.4f})")
+                return name
+            cache.reject(crop_hash)
+
+        # Compare with every known face in one matrix operation
+        try:
+            row, distance, runner_up, accepted = gallery.match(encoding, threshold)
+        except ValueError as e:
+            print(f"❌ Error comparing with known faces: {e}")
+            return "Unknown"
+
+        if not accepted:
+            if row != -1:
+                print(f"❌ Face not recognized (best distance: {distance:.4f}, threshold: {threshold}, margin: {gallery.margin})")
+            else:
+                print("❌ No known faces to compare with")
+            return "Unknown"
+
+        name = gallery.ids[row]
+        print(f"✅ Recognized: {name} (distance: {distance:.4f})")
+        if cache:
+            # The encoding buffer is reused by the next batch, so keep a copy
+            cache.put(crop_hash, version, (row, name, encoding.copy(), runner_up))
+        return name
@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+
+def dhash(crop, hash_size=8):
+    """64-bit difference hash of a preprocessed face crop.
+
+    Near-identical frames of the same face give the same hash, so it can key
+    a cache of previous match results.
+    """
+    small = cv2.resize(crop, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def cached_match(gallery, entry, query, threshold):
+    """(student_id, distance) of a cache entry if it is still the accepted match for query, else None.
+
+    An entry is (row, student_id, query, runner_up) from when the crop was
+    matched. No gallery distance moves by more than the distance between the
+    two queries, so one comparison with the cached row proves it is still
+    under the threshold and ahead of every other student by the gallery
+    margin. Two students whose crops share a hash fail this check.
+    """
+    row, student_id, previous_query, runner_up = entry
+    if gallery.index.get(student_id) != row:
+        return None
+    shift = float(np.linalg.norm(query - previous_query))
+    distance = gallery.distance_to(row, query)
+    if distance < threshold and (runner_up - shift) - distance >= gallery.margin:
+        return student_id, distance
+    return None
+
+
+class RecognitionCache:
+    """Bounded LRU cache of perceptual hash -> match result for one college.
+
+    Entries are only valid for the gallery state they were computed against;
+    when the version changes (student added, re-encoded, removed or the
+    threshold recalibrated) the cache is emptied on the next lookup.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.rejections = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            self._check_version(version)
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, version, result):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def reject(self, key):
+        """Drop an entry that failed verification and count its lookup as a miss"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self.hits -= 1
+            self.misses += 1
+            self.rejections += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'invalidations': self.invalidations,
+                'rejections': self.rejections,
+            }
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
@@ -0,0 +1,205 @@
+import base64
+import http.client
+import itertools
+import json
+import queue
+import uuid
+from urllib.parse import urlparse
+
+
+class RecognitionNodeError(Exception):
+    """A recognition node could not be reached or rejected the request"""
+
+
+class GalleryNotLoadedError(RecognitionNodeError):
+    """The node does not hold the college gallery (it restarted without a database to reload from)"""
+
+
+class NodeConnectionPool:
+    """Small pool of keep-alive HTTP connections to one recognition node"""
+
+    def __init__(self, url, size=8, timeout=30):
+        parsed = urlparse(url)
+        self.url = url
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def request(self, method, path, payload=None):
+        body = None if payload is None else json.dumps(payload).encode('utf-8')
+        try:
+            conn, pooled = self._idle.get_nowait(), True
+        except queue.Empty:
+            conn, pooled = self._connect(), False
+
+        while True:
+            try:
+                conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                data = json.loads(response.read() or b'{}')
+                break
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                conn.close()
+                if not pooled:
+                    raise RecognitionNodeError(f"{self.url}{path}: {e}") from e
+                # The node may have closed an idle keep-alive connection; retry once on a fresh one
+                conn, pooled = self._connect(), False
+
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        return response.status, data
+
+    def _connect(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+
+class RemoteFaceSystem:
+    """Thin client with the FaceRecognitionSystem interface backed by recognition nodes.
+
+    Colleges are sharded across nodes by college_id, so every college gallery
+    lives on exactly one node.
+    """
+
+    def __init__(self, node_urls, pool_size=8, timeout=30):
+        if not node_urls:
+            raise ValueError("at least one recognition node URL is required")
+        self.pools = [NodeConnectionPool(url, pool_size, timeout) for url in node_urls]
+        self._loaded = set()
+        self._encode_nodes = itertools.cycle(self.pools)
+
+    def node_for(self, college_id):
+        return self.pools[int(college_id) % len(self.pools)]
+
+    def call(self, college_id, path, payload):
+        try:
+            status, data = self.node_for(college_id).request('POST', path, payload)
+        except RecognitionNodeError:
+            # Ask the node again next time instead of trusting that it still has the gallery
+            self._loaded.discard(college_id)
+            raise
+        if status != 200:
+            self._loaded.discard(college_id)
+            if status == 409:
+                raise GalleryNotLoadedError(data.get('error', f"HTTP {status}"))
+            raise RecognitionNodeError(data.get('error', f"HTTP {status}"))
+        return data
+
+    def has_gallery(self, college_id):
+        if college_id not in self._loaded:
+            status, data = self.node_for(college_id).request('GET', f'/status?college_id={college_id}')
+            if status == 200 and data.get('loaded'):
+                self._loaded.add(college_id)
+        return college_id in self._loaded
+
+    def cache_stats(self, college_id):
+        """Recognition cache hit rates of the node serving a college"""
+        status, data = self.node_for(college_id).request('GET', f'/status?college_id={college_id}')
+        if status != 200:
+            raise RecognitionNodeError(data.get('error', f"HTTP {status}"))
+        return data.get('caches', {}).get(str(college_id))
+
+    def load_known_faces(self, students, college_id=None, batch_size=500):
+        """Replace the college gallery on its node, sending encodings in batches.
+
+        The node stages the batches of one load_id and publishes the gallery
+        with the last one.
+        """
+        if college_id is None and students:
+            college_id = students[0].college_id
+        students = [student for student in students if student.face_encoding]
+        load_id = uuid.uuid4().hex
+        starts = range(0, max(len(students), 1), batch_size)
+        for start in starts:
+            self.call(college_id, '/enroll', {
+                'college_id': college_id,
+                'replace': True,
+                'load_id': load_id,
+                'last': start == starts[-1],
+                'students': [self._student_payload(student) for student in students[start:start + batch_size]]
+            })
+        self._loaded.add(college_id)
+        print(f"✅ Sent {len(students)} face encodings to {self.node_for(college_id).url}")
+
+    def add_student(self, student):
+        if not student.face_encoding:
+            return self.remove_student(student)
+        data = self.call(student.college_id, '/enroll', {
+            'college_id': student.college_id,
+            'students': [self._student_payload(student)]
+        })
+        return data['enrolled'] > 0
+
+    def update_student(self, student):
+        return self.add_student(student)
+
+    def remove_student(self, student):
+        data = self.call(student.college_id, '/remove', {
+            'college_id': student.college_id,
+            'student_ids': [student.student_id]
+        })
+        return data['removed'] > 0
+
+    def find_duplicates(self, encoding, college_id=None, k=5, threshold=None):
+        data = self.call(college_id, '/duplicates', {
+            'college_id': college_id, 'encoding': encoding, 'k': k, 'threshold': threshold
+        })
+        return data['duplicates']
+
+    def set_calibration(self, college_id, threshold, margin=0.0):
+        self.call(college_id, '/calibrate', {'college_id': college_id, 'threshold': threshold, 'margin': margin})
+
+    def recognize_faces_data(self, images, college_id):
+        """Recognize a batch of encoded images in one round trip"""
+        data = self.call(college_id, '/recognize', {
+            'college_id': college_id,
+            'images': [base64.b64encode(image).decode('ascii') for image in images]
+        })
+        results = []
+        for result in data['results']:
+            if 'error' in result:
+                raise ValueError(result['error'])
+            results.append((result['face_names'], [tuple(loc) for loc in result['face_locations']]))
+        return results
+
+    def recognize_face_data(self, data, college_id=None):
+        return self.recognize_faces_data([data], college_id)[0]
+
+    def encode_face_data(self, data):
+        encoding, _ = self.encode_and_locate_face_data(data)
+        return encoding
+
+    def encode_and_locate_face_data(self, data):
+        """Encode the face of image bytes; encoding is stateless so nodes take turns"""
+        status, result = next(self._encode_nodes).request('POST', '/encode', {
+            'images': [base64.b64encode(data).decode('ascii')]
+        })
+        if status != 200:
+            raise RecognitionNodeError(result.get('error', f"HTTP {status}"))
+        box = result['boxes'][0]
+        return result['encodings'][0], tuple(box) if box else None
+
+    def encode_and_locate_face(self, image):
+        """Encode the face of a decoded BGR image on a node"""
+        import cv2
+        ok, data = cv2.imencode('.png', image)
+        if not ok:
+            return None, None
+        return self.encode_and_locate_face_data(data.tobytes())
+
+    def encode_face_image(self, image):
+        encoding, _ = self.encode_and_locate_face(image)
+        return encoding
+
+    def encode_face(self, image_path):
+        try:
+            with open(image_path, 'rb') as f:
+                return self.encode_face_data(f.read())
+        except OSError as e:
+            print(f"❌ Could not read image file {image_path}: {e}")
+            return None
+
+    def _student_payload(self, student):
+        return {'student_id': student.student_id, 'name': student.name, 'face_encoding': student.face_encoding}
@@ -0,0 +1,232 @@
+"""Standalone recognition node.
+
+Owns the face galleries of the colleges sharded to it and serves batched
+recognize/enroll RPCs as JSON over HTTP, so recognition can run in processes
+(or machines) separate from the Flask web workers. Run several nodes locally:
+
+    python recognition_server.py --port 5101 --database sqlite:///instance/cogniface.db
+    python recognition_server.py --port 5102 --database sqlite:///instance/cogniface.db
+
+and point the app at them with
+RECOGNITION_NODES=http://127.0.0.1:5101,http://127.0.0.1:5102
+"""
+import argparse
+import base64
+import json
+import threading
+import cv2
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import urlparse, parse_qs
+
+from face_recognition_system import FaceRecognitionSystem
+
+
+class GalleryNotLoaded(Exception):
+    """The node does not hold the gallery of the requested college"""
+
+
+class RecognitionNode:
+    """Recognition state of one node: a face system plus its galleries"""
+
+    def __init__(self, database_uri=None, detector='haar'):
+        self.face_system = FaceRecognitionSystem(detector)
+        self.engine = None
+        if database_uri:
+            from sqlalchemy import create_engine
+            self.engine = create_engine(database_uri)
+        self._load_lock = threading.Lock()
+        # Batches of full loads still in flight, by load id: (college_id, students)
+        self._staged = {}
+        self._staged_lock = threading.Lock()
+
+    def ensure_gallery(self, college_id):
+        """Make sure the college gallery is loaded, reading it from the database if we can"""
+        if self.face_system.has_gallery(college_id):
+            return
+        if self.engine is None:
+            raise GalleryNotLoaded(f"gallery for college {college_id} is not loaded")
+        with self._load_lock:
+            if self.face_system.has_gallery(college_id):
+                return
+            from sqlalchemy import text
+            from sqlalchemy.exc import OperationalError
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    text("SELECT college_id, student_id, name, face_encoding FROM student WHERE college_id = :college_id"),
+                    {'college_id': college_id}
+                ).all()
+                try:
+                    calibration = conn.execute(
+                        text("SELECT threshold, margin FROM gallery_calibration WHERE college_id = :college_id"),
+                        {'college_id': college_id}
+                    ).first()
+                except OperationalError:
+                    calibration = None  # Database predates calibration
+            if calibration:
+                self.face_system.set_calibration(college_id, calibration.threshold, calibration.margin)
+            self.face_system.load_known_faces(rows, college_id)
+
+    def recognize(self, college_id, images):
+        """Recognize a batch of encoded images against one college gallery"""
+        self.ensure_gallery(college_id)
+        results = [None] * len(images)
+        frames, positions = [], []
+        for position, data in enumerate(images):
+            frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                results[position] = {'face_names': [], 'face_locations': [], 'error': 'Could not decode image'}
+            else:
+                frames.append(frame)
+                positions.append(position)
+
+        # All decodable frames go through detection, preprocessing and matching as one micro-batch
+        for position, (face_names, face_locations) in zip(positions, self.face_system.recognize_faces(frames, college_id)):
+            results[position] = {'face_names': face_names, 'face_locations': face_locations}
+        return results
+
+    def enroll(self, college_id, students, replace=False, load_id=None, last=True):
+        """Load (replace=True) or patch a college gallery with student encodings.
+        
+        A full load sent in several batches shares a load_id; its batches are
+        staged and the gallery is only built and published with the last one,
+        so recognition never matches against part of a college.
+        """
+        students = [SimpleNamespace(college_id=college_id, **student) for student in students]
+        if replace:
+            if load_id is not None:
+                with self._staged_lock:
+                    staged_college, staged = self._staged.setdefault(load_id, (college_id, []))
+                    if staged_college != college_id:
+                        raise ValueError(f"load {load_id} belongs to college {staged_college}")
+                    staged.extend(students)
+                    if not last:
+                        return 0
+                    students = self._staged.pop(load_id)[1]
+            self.face_system.load_known_faces(students, college_id)
+            return len(self.face_system.get_gallery(college_id))
+        # Patching a gallery we never loaded would leave it partial
+        self.ensure_gallery(college_id)
+        return sum(1 for student in students if self.face_system.add_student(student))
+
+    def remove(self, college_id, student_ids):
+        """Drop students from a college gallery"""
+        return sum(
+            1 for student_id in student_ids
+            if self.face_system.remove_student(SimpleNamespace(college_id=college_id, student_id=student_id))
+        )
+
+    def encode(self, images):
+        """Encode the face of each encoded image as (encoding, box); None values where no face was found"""
+        results = []
+        for data in images:
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            results.append(self.face_system.encode_and_locate_face(image) if image is not None else (None, None))
+        return results
+
+    def status(self):
+        return {
+            'galleries': {
+                str(college_id): {'size': len(gallery), 'version': gallery.version}
+                for college_id, gallery in self.face_system.galleries.items()
+            },
+            'caches': {
+                str(college_id): stats for college_id, stats in self.face_system.cache_stats().items()
+            },
+        }
+
+
+class RecognitionRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive so clients can pool connections
+    protocol_version = 'HTTP/1.1'
+    node = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/status':
+            status = self.node.status()
+            college_id = parse_qs(url.query).get('college_id')
+            if college_id:
+                status['loaded'] = self.node.face_system.has_gallery(int(college_id[0]))
+            return self.send_json(200, status)
+        self.send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            path = urlparse(self.path).path
+            if path == '/recognize':
+                images = [base64.b64decode(image) for image in payload['images']]
+                result = {'results': self.node.recognize(int(payload['college_id']), images)}
+            elif path == '/enroll':
+                count = self.node.enroll(int(payload['college_id']), payload['students'], payload.get('replace', False),
+                                         payload.get('load_id'), payload.get('last', True))
+                result = {'enrolled': count}
+            elif path == '/duplicates':
+                college_id = int(payload['college_id'])
+                self.node.ensure_gallery(college_id)
+                result = {'duplicates': self.node.face_system.find_duplicates(
+                    payload['encoding'], college_id, int(payload.get('k', 5)), payload.get('threshold'))}
+            elif path == '/calibrate':
+                # Only records the values; a gallery that is not loaded yet picks them up when it is
+                self.node.face_system.set_calibration(int(payload['college_id']), float(payload['threshold']),
+                                                      float(payload.get('margin') or 0.0))
+                result = {'calibrated': True}
+            elif path == '/remove':
+                result = {'removed': self.node.remove(int(payload['college_id']), payload['student_ids'])}
+            elif path == '/encode':
+                images = [base64.b64decode(image) for image in payload['images']]
+                encoded = self.node.encode(images)
+                result = {'encodings': [encoding for encoding, _ in encoded], 'boxes': [box for _, box in encoded]}
+            else:
+                return self.send_json(404, {'error': 'Not found'})
+            self.send_json(200, result)
+        except GalleryNotLoaded as e:
+            self.send_json(409, {'error': str(e)})
+        except (KeyError, ValueError, TypeError) as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            print(f"❌ Error handling {self.path}: {e}")
+            self.send_json(500, {'error': str(e)})
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host='127.0.0.1', port=5101, database_uri=None, detector='haar'):
+    """Create a threaded HTTP server around a fresh recognition node"""
+    node = RecognitionNode(database_uri, detector)
+    handler = type('NodeRequestHandler', (RecognitionRequestHandler,), {'node': node})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CogniFace recognition node')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5101)
+    parser.add_argument('--database', help='SQLAlchemy URI to load galleries from on first use')
+    parser.add_argument('--detector', choices=['haar', 'lbp'], default='haar', help='Face detection cascade')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.database, args.detector)
+    print(f"✅ Recognition node listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+import time
+from contextlib import contextmanager
+
+PROCESS_START = time.perf_counter()
+
+# (phase name, seconds) in the order the phases finished
+phases = []
+
+
+@contextmanager
+def phase(name):
+    """Time a startup or warm-up phase and record it in the profile"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases.append((name, time.perf_counter() - start))
+
+
+def report():
+    """Return the startup profile as printable text"""
+    lines = ["📊 Startup profile:"]
+    for name, seconds in phases:
+        lines.append(f"  {name:<40} {seconds * 1000:9.1f} ms")
+    lines.append(f"  {'total since process start':<40} {(time.perf_counter() - PROCESS_START) * 1000:9.1f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from attendance_export import EXPORT_COLUMNS, stream_csv, stream_json
+from database import db, Admin, Attendance, College, Student
+
+
+@pytest.fixture
+def client(cogniface_app):
+    for code in ('A/B', 'Z'):
+        college = College(name=f"College {code}", code=code)
+        db.session.add(college)
+        db.session.flush()
+        admin = Admin(username=f"admin{college.id}", college_id=college.id)
+        admin.set_password('secret')
+        student = Student(college_id=college.id, student_id=f"{college.id}-1", name=f"Student, {code}")
+        db.session.add_all([admin, student])
+        db.session.flush()
+        for day in range(1, 6):
+            check_in = datetime(2026, 10, day, 8, 30)
+            check_out = check_in + timedelta(hours=7) if day != 3 else None
+            attendance = Attendance(student_id=student.id, date=date(2026, 10, day),
+                                    check_in=check_in, check_out=check_out)
+            attendance.calculate_duration()
+            db.session.add(attendance)
+    db.session.commit()
+
+    client = cogniface_app.app.test_client()
+    client.post('/login', data={'username': 'admin1', 'password': 'secret'})
+    return client
+
+
+def test_csv_export_is_filtered_by_college_and_date(client):
+    response = client.get('/attendance-export.csv?start=2026-10-02&end=2026-10-04')
+
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename="attendance_A_B_2026-10-02_2026-10-04.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['date'] for row in rows] == ['2026-10-02', '2026-10-03', '2026-10-04']
+    assert {row['student_id'] for row in rows} == {'1-1'}
+    assert rows[0] == {
+        'student_id': '1-1', 'name': 'Student, A/B', 'date': '2026-10-02',
+        'check_in': '2026-10-02T08:30:00', 'check_out': '2026-10-02T15:30:00',
+        'duration_seconds': '25200', 'status': rows[0]['status'],
+    }
+    assert rows[1]['check_out'] == '' and rows[1]['duration_seconds'] == ''
+
+
+def test_json_export_without_dates_returns_everything(client):
+    response = client.get('/attendance-export.json')
+
+    assert response.mimetype == 'application/json'
+    rows = json.loads(response.get_data(as_text=True))
+    assert [row['date'] for row in rows] == [f"2026-10-0{day}" for day in range(1, 6)]
+    assert list(rows[0]) == EXPORT_COLUMNS
+    assert rows[2]['check_out'] is None
+
+
+def test_export_rejects_bad_dates_and_formats(client):
+    assert client.get('/attendance-export.csv?start=02/10/2026').status_code == 400
+    assert client.get('/attendance-export.xml').status_code == 404
+
+
+@pytest.mark.parametrize('count', [0, 1, 5, 6])
+def test_streams_split_into_chunks_join_to_the_whole_document(count):
+    rows = [{column: f"{column}{i}" for column in EXPORT_COLUMNS} for i in range(count)]
+
+    assert json.loads(''.join(stream_json(iter(rows), chunk_size=2))) == rows
+    assert list(csv.DictReader(io.StringIO(''.join(stream_csv(iter(rows), chunk_size=2))))) == rows
@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+
+from batch_preprocessing import BatchPreprocessor
+from improved_face_recognition import ImprovedFaceRecognitionSystem
+
+
+def random_frame(seed, size=(480, 640)):
+    return np.random.default_rng(seed).integers(0, 256, size, dtype=np.uint8)
+
+
+BOXES = [(10, 20, 120, 120), (200, 100, 64, 80), (400, 300, 150, 130)]
+
+
+def test_batch_matches_improved_preprocess_face():
+    face_system = ImprovedFaceRecognitionSystem()
+    gray = random_frame(0)
+
+    encodings, crops = BatchPreprocessor().process(gray, BOXES)
+
+    assert encodings.shape == (len(BOXES), 100 * 100)
+    for row, (x, y, w, h) in enumerate(BOXES):
+        expected = face_system.preprocess_face(gray[y:y+h, x:x+w])
+        np.testing.assert_allclose(encodings[row], expected, rtol=1e-5, atol=1e-7)
+
+
+def test_plain_batch_matches_resize_and_scale():
+    gray = random_frame(1)
+
+    encodings, _ = BatchPreprocessor(equalize=False, blur=False, unit_normalize=False).process(gray, BOXES)
+
+    for row, (x, y, w, h) in enumerate(BOXES):
+        expected = cv2.resize(gray[y:y+h, x:x+w], (100, 100)).astype(np.float32).flatten() / 255.0
+        np.testing.assert_allclose(encodings[row], expected, rtol=1e-6)
+
+
+def test_micro_batch_grows_buffers_and_keeps_frame_order():
+    frames = [(random_frame(seed), BOXES) for seed in range(4)]
+    preprocessor = BatchPreprocessor(capacity=2)
+
+    encodings, _ = preprocessor.process_batch(frames)
+
+    assert len(encodings) == 4 * len(BOXES)
+    for index, (gray, boxes) in enumerate(frames):
+        single, _ = BatchPreprocessor().process(gray, boxes)
+        np.testing.assert_array_equal(encodings[index * len(BOXES):(index + 1) * len(BOXES)], single)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+import calibration
+from calibration import calibrate_gallery
+from face_gallery import FaceGallery
+
+
+def make_gallery(count, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    gallery = FaceGallery(normalize=False)
+    for i in range(count):
+        gallery.add(f"S{i}", f"Student {i}", rng.random(dim, dtype=np.float32))
+    return gallery
+
+
+def probes_with_impostor_under(gallery, threshold, ignore=()):
+    distances = gallery.distances(gallery.encodings)
+    np.fill_diagonal(distances, np.inf)
+    keep = [row for row, student_id in enumerate(gallery.ids) if student_id not in ignore]
+    return float(np.mean(distances[keep].min(axis=1) < threshold))
+
+
+def test_calibration_bounds_the_one_to_many_false_accept_rate():
+    gallery = make_gallery(2000, seed=2)
+
+    result = calibrate_gallery(gallery, target_far=0.005)
+
+    probes = probes_with_impostor_under(gallery, result['threshold'])
+    assert probes <= 0.005
+    assert result['far'] == pytest.approx(probes)
+    assert result['pairwise_far'] <= result['far']
+    assert result['duplicate_count'] == 0
+
+
+def test_duplicate_enrollment_does_not_collapse_the_threshold():
+    gallery = make_gallery(300, seed=3)
+    clean = calibrate_gallery(gallery)
+
+    gallery.add('DUPLICATE', 'Enrolled twice', gallery.encodings[5].copy())
+    result = calibrate_gallery(gallery)
+
+    assert result['duplicate_count'] == 2
+    assert result['threshold'] == pytest.approx(clean['threshold'])
+    assert probes_with_impostor_under(gallery, result['threshold'], ignore=('S5', 'DUPLICATE')) <= 0.001
+
+
+@pytest.mark.parametrize('fitted', [
+    {'threshold': 0.0, 'frr': None},
+    {'threshold': 0.4, 'frr': 0.9},
+])
+def test_calibrate_command_refuses_unusable_thresholds(cogniface_app, monkeypatch, fitted):
+    from database import db, College, Student, GalleryCalibration
+
+    college = College(name='College', code='C')
+    db.session.add(college)
+    db.session.flush()
+    for i in range(3):
+        db.session.add(Student(college_id=college.id, student_id=f"S{i}", name='Student',
+                               face_encoding=f"[{i}, 1, 2]"))
+    db.session.commit()
+    result = dict(margin=0.0, far=0.0, pairwise_far=0.0, probe_count=3, duplicate_count=0,
+                  frames_per_checkin=None, genuine_count=0, impostor_count=3, **fitted)
+    monkeypatch.setattr(calibration, 'calibrate_gallery', lambda *args, **kwargs: result)
+
+    outcome = cogniface_app.app.test_cli_runner().invoke(args=['calibrate', str(college.id)])
+
+    assert outcome.exit_code != 0
+    assert 'not stored' in outcome.output
+    assert GalleryCalibration.query.count() == 0
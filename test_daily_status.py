@@ -0,0 +1,62 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from database import db, College, Student, Attendance
+from daily_status import attendance_summary, close_days, pending_range
+
+
+@pytest.fixture
+def attendance_db(cogniface_app):
+    students = []
+    for code in ('A', 'B'):
+        college = College(name=f"College {code}", code=code)
+        db.session.add(college)
+        db.session.flush()
+        student = Student(college_id=college.id, student_id=f"{code}1", name=f"Student {code}")
+        db.session.add(student)
+        db.session.flush()
+        students.append(student)
+    for student in students:
+        for day in range(1, 11):
+            check_in = datetime(2026, 10, day, 8)
+            # Every third day the student never checks out
+            check_out = None if day % 3 == 0 else check_in + timedelta(hours=7)
+            attendance = Attendance(student_id=student.id, date=date(2026, 10, day),
+                                    check_in=check_in, check_out=check_out)
+            attendance.calculate_duration()
+            db.session.add(attendance)
+    db.session.commit()
+    return [(student.college_id, student.id) for student in students]
+
+
+def test_close_days_with_gaps_keeps_every_day_counted(attendance_db):
+    (college_a, student_a), (college_b, student_b) = attendance_db
+    today = date(2026, 10, 19)
+    assert attendance_summary(college_a) == {student_a: (10, 10)}
+
+    # Closing a single day in the middle leaves the earlier days open, not lost
+    close_days(date(2026, 10, 6), date(2026, 10, 6))
+    assert attendance_summary(college_a) == {student_a: (10, 9)}
+    assert pending_range(today) == (date(2026, 10, 1), date(2026, 10, 18))
+
+    # Closing one college does not hide the other college's open days
+    close_days(date(2026, 10, 1), date(2026, 10, 3), college_id=college_a)
+    assert pending_range(today, college_id=college_a) == (date(2026, 10, 4), date(2026, 10, 18))
+    assert pending_range(today) == (date(2026, 10, 1), date(2026, 10, 18))
+
+    close_days(*pending_range(today))
+    assert pending_range(today) is None
+    # Days 3, 6 and 9 had no check-out and are now ABSENT
+    assert attendance_summary(college_a) == {student_a: (10, 7)}
+    assert attendance_summary(college_b) == {student_b: (10, 7)}
+
+
+def test_reclosing_a_range_is_idempotent(attendance_db):
+    (college_a, student_a), _ = attendance_db
+    first = close_days(date(2026, 10, 1), date(2026, 10, 10))
+    second = close_days(date(2026, 10, 1), date(2026, 10, 10))
+
+    assert first == {'closed_sessions': 6, 'daily_rows': 20}
+    assert second == {'closed_sessions': 0, 'daily_rows': 20}
+    assert attendance_summary(college_a) == {student_a: (10, 7)}
@@ -0,0 +1,32 @@
+import numpy as np
+
+from duplicate_scan import find_near_duplicate_pairs
+from face_gallery import FaceGallery
+
+
+def make_gallery(count, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    gallery = FaceGallery(normalize=False, initial_capacity=4)
+    for i in range(count):
+        gallery.add(f"S{i}", f"Student {i}", rng.random(dim, dtype=np.float32))
+    return gallery
+
+
+def test_near_duplicate_pairs_match_brute_force():
+    rng = np.random.default_rng(1)
+    gallery = make_gallery(300, seed=1)
+    # Plant some near-duplicates of existing students
+    for i in range(0, 300, 7):
+        gallery.add(f"D{i}", "Duplicate", gallery.encodings[i] + rng.normal(0, 0.02, 16).astype(np.float32))
+    threshold = 0.5
+
+    pairs = find_near_duplicate_pairs(gallery, threshold, tile_size=32)
+
+    distances = gallery.distances(gallery.encodings)
+    expected = {
+        frozenset((gallery.ids[i], gallery.ids[j]))
+        for i, j in zip(*np.nonzero(distances < threshold)) if i < j
+    }
+    assert {frozenset(pair[:2]) for pair in pairs} == expected
+    assert len(pairs) == len(expected)
+    assert [pair[2] for pair in pairs] == sorted(pair[2] for pair in pairs)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from face_gallery import FaceGallery
+
+
+def make_gallery(count, dim=32, seed=0, normalize=False):
+    rng = np.random.default_rng(seed)
+    gallery = FaceGallery(normalize=normalize, initial_capacity=4)
+    for i in range(count):
+        gallery.add(f"S{i}", f"Student {i}", rng.random(dim, dtype=np.float32))
+    return gallery
+
+
+def test_gallery_remove_moves_last_row_into_freed_slot():
+    gallery = make_gallery(5)
+    last = gallery.encodings[4].copy()
+
+    assert gallery.remove('S1')
+    assert len(gallery) == 4
+    assert gallery.ids == ['S0', 'S4', 'S2', 'S3']
+    assert gallery.index == {'S0': 0, 'S4': 1, 'S2': 2, 'S3': 3}
+    np.testing.assert_array_equal(gallery.encodings[1], last)
+    assert gallery.sq_norms[1] == pytest.approx(float(last @ last))
+    assert not gallery.remove('S1')
+
+
+def test_gallery_update_replaces_row_in_place():
+    gallery = make_gallery(3)
+    version = gallery.version
+    encoding = np.full(32, 0.5, dtype=np.float32)
+
+    assert gallery.update('S1', 'Renamed', encoding) == 1
+    assert len(gallery) == 3
+    assert gallery.names[1] == 'Renamed'
+    np.testing.assert_array_equal(gallery.encodings[1], encoding)
+    assert gallery.version > version
+
+    row, distance, _, accepted = gallery.match(encoding, threshold=1e-3)
+    assert (row, accepted) == (1, True)
+    assert distance == pytest.approx(0.0, abs=1e-3)
+
+
+def test_gallery_topk_orders_nearest_first_and_handles_empty():
+    gallery = make_gallery(10, seed=4)
+    query = gallery.encodings[3] + 0.01
+
+    rows, distances = gallery.topk(query, 3)
+    assert rows.shape == (1, 3)
+    assert rows[0, 0] == 3
+    assert list(distances[0]) == sorted(distances[0])
+    np.testing.assert_allclose(distances[0], gallery.distances(query)[0, rows[0]], rtol=1e-5)
+
+    rows, distances = FaceGallery().topk(query, 3)
+    assert rows.tolist() == [[-1]] and np.isinf(distances[0, 0])
@@ -0,0 +1,102 @@
+import io
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from image_ingest import IngestError, content_path, ingest_upload, prune_uploads, reuse_upload
+
+
+class CountingFaceSystem:
+    """Stands in for a recognition system; the encoding is the image shape"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode_face_image(self, image):
+        self.calls += 1
+        return f"{image.shape[1]}x{image.shape[0]}"
+
+
+def jpeg_bytes(width=1600, height=1200, seed=0):
+    image = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return cv2.imencode('.jpg', image)[1].tobytes()
+
+
+def stored_files(folder):
+    return sorted(os.path.join(directory, name) for directory, _, names in os.walk(folder) for name in names)
+
+
+def test_same_photo_is_stored_once_as_a_bounded_master(tmp_path):
+    face_system = CountingFaceSystem()
+    data = jpeg_bytes()
+
+    first = ingest_upload(io.BytesIO(data), str(tmp_path), face_system)
+    second = ingest_upload(io.BytesIO(data), str(tmp_path), face_system)
+
+    assert first == second
+    assert first['photo_path'] == content_path(str(tmp_path), 'masters', first['content_hash'])
+    assert stored_files(tmp_path) == [first['photo_path']]
+    assert first['face_encoding'] == '1024x768'
+    assert ingest_upload(io.BytesIO(jpeg_bytes(seed=1)), str(tmp_path), face_system)['content_hash'] != first['content_hash']
+
+
+@pytest.mark.parametrize('data, max_bytes, message', [
+    (jpeg_bytes(), 100_000, 'larger than'),
+    (b'not an image', None, 'could not decode'),
+    (b'', None, 'empty'),
+])
+def test_rejected_uploads_store_nothing(tmp_path, data, max_bytes, message):
+    face_system = CountingFaceSystem()
+    with pytest.raises(IngestError, match=message):
+        ingest_upload(io.BytesIO(data), str(tmp_path), face_system, max_bytes=max_bytes)
+    assert stored_files(tmp_path) == []
+    assert face_system.calls == 0
+
+
+def test_resubmitted_form_reuses_the_stored_master(tmp_path):
+    face_system = CountingFaceSystem()
+    ingested = ingest_upload(io.BytesIO(jpeg_bytes()), str(tmp_path), face_system)
+
+    assert reuse_upload(ingested['content_hash'], str(tmp_path), face_system) == ingested
+    with pytest.raises(IngestError):
+        reuse_upload('../' * 10 + 'etc/passwd', str(tmp_path), face_system)
+    with pytest.raises(IngestError):
+        reuse_upload('0' * 64, str(tmp_path), face_system)
+
+
+def test_prune_removes_only_old_unreferenced_uploads(tmp_path):
+    face_system = CountingFaceSystem()
+    kept, orphaned, recent = (ingest_upload(io.BytesIO(jpeg_bytes(seed=seed)), str(tmp_path), face_system)['photo_path']
+                              for seed in range(3))
+    for path in (kept, orphaned):
+        os.utime(path, (0, 0))
+
+    assert prune_uploads(str(tmp_path), [kept, None]) == [os.path.normpath(orphaned)]
+    assert stored_files(tmp_path) == sorted([kept, recent])
+
+
+def test_enroll_anyway_resubmits_without_choosing_the_photo_again(cogniface_app, tmp_path, monkeypatch):
+    from database import db, Admin, College, Student
+
+    monkeypatch.setitem(cogniface_app.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    college = College(name='College', code='C')
+    db.session.add(college)
+    db.session.flush()
+    admin = Admin(username='admin', college_id=college.id)
+    admin.set_password('secret')
+    db.session.add(admin)
+    db.session.commit()
+    face_system = cogniface_app.college_face_system(college.id)
+    ingested = ingest_upload(io.BytesIO(jpeg_bytes()), str(tmp_path), face_system)
+
+    client = cogniface_app.app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    response = client.post('/add-student', data={
+        'student_id': 'S1', 'name': 'Student', 'email': 's@example.com',
+        'content_hash': ingested['content_hash'], 'allow_duplicate': '1'
+    })
+
+    assert response.status_code == 302
+    assert Student.query.filter_by(student_id='S1').one().photo_path == ingested['photo_path']
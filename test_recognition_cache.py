@@ -0,0 +1,80 @@
+import numpy as np
+
+from face_gallery import FaceGallery
+from face_recognition_system import FaceRecognitionSystem
+from recognition_cache import RecognitionCache, cached_match, dhash
+
+
+def make_gallery(count, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    gallery = FaceGallery(normalize=False)
+    for i in range(count):
+        gallery.add(f"S{i}", f"Student {i}", rng.random(dim, dtype=np.float32))
+    return gallery
+
+
+def entry_for(gallery, query, threshold):
+    row, distance, runner_up, accepted = gallery.match(query, threshold)
+    assert accepted
+    return (row, gallery.ids[row], query.copy(), runner_up)
+
+
+def test_cached_match_accepts_the_same_student_in_a_nearby_frame():
+    rng = np.random.default_rng(1)
+    gallery = make_gallery(50)
+    threshold = 0.5
+    query = gallery.encodings[7] + rng.normal(0, 0.01, 32).astype(np.float32)
+    entry = entry_for(gallery, query, threshold)
+
+    nearby = query + rng.normal(0, 0.01, 32).astype(np.float32)
+    student_id, distance = cached_match(gallery, entry, nearby, threshold)
+    assert student_id == 'S7'
+    assert np.isclose(distance, gallery.match(nearby, threshold)[1], atol=1e-5)
+
+
+def test_cached_match_rejects_another_student_with_the_same_hash():
+    gallery = make_gallery(50)
+    threshold = 0.5
+    entry = entry_for(gallery, gallery.encodings[7].copy(), threshold)
+
+    assert cached_match(gallery, entry, gallery.encodings[8].copy(), threshold) is None
+
+
+def test_cached_match_rejects_an_entry_whose_row_moved():
+    gallery = make_gallery(50)
+    threshold = 0.5
+    entry = entry_for(gallery, gallery.encodings[7].copy(), threshold)
+
+    # Removing a student swaps the last row into its place
+    gallery.remove('S7')
+    assert cached_match(gallery, entry, gallery.encodings[7].copy(), threshold) is None
+
+
+def test_cache_evicts_least_recently_used_and_clears_on_new_version():
+    cache = RecognitionCache(max_entries=2)
+    cache.put(1, 'v1', 'a')
+    cache.put(2, 'v1', 'b')
+    assert cache.get(1, 'v1') == 'a'
+    cache.put(3, 'v1', 'c')
+    assert cache.get(2, 'v1') is None
+    assert cache.get(1, 'v1') == 'a'
+
+    assert cache.get(1, 'v2') is None
+    cache.reject(3)
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'hit_rate': 0.25, 'entries': 0, 'max_entries': 2,
+                             'invalidations': 1, 'rejections': 1}
+
+
+def test_match_face_does_not_return_a_cached_student_for_another_face():
+    face_system = FaceRecognitionSystem()
+    gallery = make_gallery(50)
+    threshold = 0.5
+    cache = face_system.get_cache(1)
+    crop_hash = dhash(np.zeros((64, 64), np.uint8))
+
+    assert face_system.match_face(gallery, threshold, gallery.encodings[7].copy(), cache, crop_hash, 'v') == 'S7'
+    assert face_system.match_face(gallery, threshold, gallery.encodings[7].copy(), cache, crop_hash, 'v') == 'S7'
+    # Same crop hash, different face: the cached entry fails verification
+    assert face_system.match_face(gallery, threshold, gallery.encodings[8].copy(), cache, crop_hash, 'v') == 'S8'
+    stats = cache.stats()
+    assert (stats['hits'], stats['rejections']) == (1, 1)
@@ -0,0 +1,146 @@
+import json
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from recognition_client import RemoteFaceSystem
+from recognition_server import RecognitionNode, make_server
+
+
+def students(college_id, count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [SimpleNamespace(college_id=college_id, student_id=f"C{college_id}S{i}", name=f"Student {i}",
+                            face_encoding=json.dumps(rng.random(16).tolist()))
+            for i in range(count)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def node_server():
+    server = make_server('127.0.0.1', 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_calibrating_a_node_does_not_hide_its_database_gallery(tmp_path):
+    database = tmp_path / 'node.db'
+    rng = np.random.default_rng(3)
+    with sqlite3.connect(database) as conn:
+        conn.execute("CREATE TABLE student (id INTEGER PRIMARY KEY, college_id INTEGER, "
+                     "student_id TEXT, name TEXT, face_encoding TEXT)")
+        conn.executemany("INSERT INTO student (college_id, student_id, name, face_encoding) VALUES (3, ?, ?, ?)",
+                         [(f"S{i}", "Student", json.dumps(rng.random(16).tolist())) for i in range(5)])
+
+    server = make_server('127.0.0.1', 0, f"sqlite:///{database}")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        node = server.RequestHandlerClass.node
+        remote = RemoteFaceSystem([f"http://127.0.0.1:{server.server_address[1]}"])
+
+        remote.set_calibration(3, 0.5, 0.1)
+        assert not remote.has_gallery(3)
+
+        remote.find_duplicates(json.dumps(rng.random(16).tolist()), 3)
+        gallery = node.face_system.galleries[3]
+        assert len(gallery) == 5
+        assert (gallery.threshold, gallery.margin) == (0.5, 0.1)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_batched_load_publishes_the_gallery_with_its_last_batch():
+    node = RecognitionNode()
+    batch = [{'student_id': s.student_id, 'name': s.name, 'face_encoding': s.face_encoding} for s in students(1, 5)]
+    node.enroll(1, batch[:3], replace=True, load_id='load', last=False)
+    # Recognition must not see the first batch on its own
+    assert not node.face_system.has_gallery(1)
+
+    node.enroll(1, batch[3:], replace=True, load_id='load', last=True)
+    assert node.face_system.get_gallery(1).ids == [s['student_id'] for s in batch]
+    assert not node._staged
+
+
+def test_colleges_are_sharded_across_node_processes():
+    ports = [free_port(), free_port()]
+    nodes = [subprocess.Popen([sys.executable, 'recognition_server.py', '--port', str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+             for port in ports]
+    try:
+        remote = RemoteFaceSystem([f"http://127.0.0.1:{port}" for port in ports])
+        deadline = time.monotonic() + 30
+        for pool in remote.pools:
+            while True:
+                try:
+                    pool.request('GET', '/status')
+                    break
+                except Exception:
+                    assert time.monotonic() < deadline, f"{pool.url} did not start"
+                    time.sleep(0.2)
+
+        galleries = {college_id: students(college_id, 7, seed=college_id) for college_id in (1, 2, 3, 4)}
+        for college_id, college_students in galleries.items():
+            remote.load_known_faces(college_students, college_id, batch_size=3)
+
+        for college_id, college_students in galleries.items():
+            owner = remote.pools[college_id % len(ports)]
+            other = remote.pools[(college_id + 1) % len(ports)]
+            assert owner.request('GET', f'/status?college_id={college_id}')[1]['loaded']
+            assert not other.request('GET', f'/status?college_id={college_id}')[1]['loaded']
+            # Each college only matches its own students on its own node
+            duplicates = remote.find_duplicates(college_students[5].face_encoding, college_id, k=1, threshold=1e-3)
+            assert [d['student_id'] for d in duplicates] == [college_students[5].student_id]
+    finally:
+        for node in nodes:
+            node.terminate()
+            node.wait(timeout=10)
+
+
+def test_app_pushes_the_gallery_again_after_a_node_restart(cogniface_app, node_server, monkeypatch):
+    from database import db, College, Student
+
+    monkeypatch.setitem(cogniface_app.app.config, 'RECOGNITION_NODES',
+                        [f"http://127.0.0.1:{node_server.server_address[1]}"])
+    monkeypatch.setattr(cogniface_app, '_face_system', None)
+    college = College(name='College', code='C')
+    db.session.add(college)
+    db.session.flush()
+    enrolled = students(college.id, 4)
+    for student in enrolled:
+        db.session.add(Student(college_id=college.id, student_id=student.student_id, name=student.name,
+                               face_encoding=student.face_encoding))
+    db.session.commit()
+
+    node = node_server.RequestHandlerClass.node
+    cogniface_app.college_face_system(college.id)
+    assert len(node.face_system.get_gallery(college.id)) == 4
+
+    # A restarted node without a database has no galleries, but the worker still believes it has
+    node.face_system.galleries.clear()
+    duplicates = cogniface_app.with_college_gallery(
+        college.id, lambda face_system: face_system.find_duplicates(enrolled[2].face_encoding, college.id, k=1))
+    assert [d['student_id'] for d in duplicates] == [enrolled[2].student_id]
+
+    # A committed change patched after another restart is pushed with the full gallery
+    node.face_system.galleries.clear()
+    student = Student(college_id=college.id, student_id='NEW', name='New',
+                      face_encoding=students(college.id, 1, seed=9)[0].face_encoding)
+    db.session.add(student)
+    db.session.commit()
+    face_system = cogniface_app.get_face_system()
+    cogniface_app.patch_college_gallery(college.id, None, lambda: face_system.add_student(student))
+    assert len(node.face_system.get_gallery(college.id)) == 5
@@ -0,0 +1,38 @@
+import importlib.util
+import os
+
+from database import db, Admin, College
+
+
+def test_metrics_do_not_initialize_recognition(cogniface_app, monkeypatch):
+    monkeypatch.setattr(cogniface_app, '_face_system', None)
+    college = College(name='College', code='C')
+    db.session.add(college)
+    db.session.flush()
+    admin = Admin(username='admin', college_id=college.id)
+    admin.set_password('secret')
+    db.session.add(admin)
+    db.session.commit()
+
+    client = cogniface_app.app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    response = client.get('/recognition-metrics')
+
+    assert response.get_json() == {'success': True, 'college_id': college.id, 'cache': None}
+    assert cogniface_app._face_system is None
+
+
+def test_gunicorn_workers_warm_up_after_fork(cogniface_app, monkeypatch):
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', os.path.join(os.path.dirname(__file__), 'gunicorn.conf.py'))
+    gunicorn_conf = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gunicorn_conf)
+    calls = []
+    monkeypatch.setattr(cogniface_app, 'warm_up_recognition', lambda: calls.append('warmup'))
+
+    monkeypatch.delenv('COGNIFACE_WARMUP', raising=False)
+    gunicorn_conf.post_fork(None, None)
+    assert calls == []
+
+    monkeypatch.setenv('COGNIFACE_WARMUP', '1')
+    gunicorn_conf.post_fork(None, None)
+    assert calls == ['warmup']